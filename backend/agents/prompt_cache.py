@@ -0,0 +1,151 @@
+"""
+Prompt-prefix caching support.
+
+OpenAI caches prompt prefixes automatically (from PROMPT_CACHE_MIN_TOKENS
+on) but only reuses them on a byte-identical match. Agent prompts are laid
+out so the part shared between calls comes first, in a fixed order:
+
+    1. SYSTEM_PROMPT              same for every request
+    2. tool definitions           bound once; the API places them with the prefix
+    3. conversation summary       changes only when the summary is folded
+    4. replayed turns             append-only until trimmed
+    5. current query, then tool calls/results of this request
+
+Every LLM call passes a prompt_cache_key per prompt kind so calls sharing a
+prefix are routed to the same cache, and the cached-token counts from the
+usage metadata are recorded per call, per request and in aggregate.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import (
+    PROMPT_CACHE_MIN_TOKENS,
+    PROMPT_CACHE_KEY_PREFIX,
+    LLM_CACHED_INPUT_DISCOUNT,
+    PROMPT_CACHE_TRACKED_SESSIONS
+)
+
+
+# Usage totals of the request being served (set by run_agent)
+_request_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_usage", default=None)
+
+_metrics = {
+    "calls": 0,
+    "cache_hit_calls": 0,
+    "input_tokens": 0,
+    "cached_tokens": 0,
+    "output_tokens": 0,
+    "latency_s_cached": 0.0,
+    "latency_s_uncached": 0.0,
+    "prefix_reused": 0,
+    "prefix_changed": 0
+}
+_by_kind: Dict[str, Dict[str, int]] = {}
+
+# Last prefix fingerprint per session (to spot prefixes that keep changing);
+# least recently used sessions are dropped past PROMPT_CACHE_TRACKED_SESSIONS
+_session_prefixes: "OrderedDict[str, str]" = OrderedDict()
+
+# Estimated tokens of the static prefix (system prompt + tool definitions)
+_static_prefix_tokens = 0
+
+
+def cache_key(kind: str) -> str:
+    """prompt_cache_key for a prompt kind ("agent", "batch", "deadline", "summary")."""
+    return f"{PROMPT_CACHE_KEY_PREFIX}:{kind}"
+
+
+def tool_definitions(tools: List[Any]) -> str:
+    """Tool schemas as sent to the API, serialized deterministically."""
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    
+    return json.dumps([convert_to_openai_tool(tool) for tool in tools], sort_keys=True)
+
+
+def set_static_prefix(system_prompt: str, tools: List[Any]) -> None:
+    """Record the size of the prefix every agent call shares."""
+    global _static_prefix_tokens
+    _static_prefix_tokens = (len(system_prompt) + len(tool_definitions(tools)) + 3) // 4
+
+
+def note_prefix(session_id: str, prefix_messages: List[Dict[str, str]]) -> None:
+    """Count whether a session's prefix (summary included) matches its previous request."""
+    fingerprint = hashlib.sha1(
+        json.dumps(prefix_messages, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    previous = _session_prefixes.pop(session_id, None)
+    if previous is not None:
+        _metrics["prefix_reused" if previous == fingerprint else "prefix_changed"] += 1
+    _session_prefixes[session_id] = fingerprint
+    while len(_session_prefixes) > PROMPT_CACHE_TRACKED_SESSIONS:
+        _session_prefixes.popitem(last=False)
+
+
+def forget_session(session_id: str) -> None:
+    """Drop a cleared session's prefix fingerprint."""
+    _session_prefixes.pop(session_id, None)
+
+
+@contextmanager
+def track_request_usage() -> Iterator[Dict[str, int]]:
+    """Total the usage of the LLM calls made inside the block (yields the live totals)."""
+    usage = {"llm_calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+def record_usage(kind: str, response: Any, latency_s: float) -> None:
+    """Record token usage (incl. cache reads) of one LLM response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    
+    _metrics["calls"] += 1
+    _metrics["input_tokens"] += input_tokens
+    _metrics["cached_tokens"] += cached
+    _metrics["output_tokens"] += output_tokens
+    if cached:
+        _metrics["cache_hit_calls"] += 1
+        _metrics["latency_s_cached"] += latency_s
+    else:
+        _metrics["latency_s_uncached"] += latency_s
+    
+    kind_metrics = _by_kind.setdefault(kind, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+    kind_metrics["calls"] += 1
+    kind_metrics["input_tokens"] += input_tokens
+    kind_metrics["cached_tokens"] += cached
+    
+    request_usage = _request_usage.get()
+    # Background summaries inherit the request's context but aren't part of its cost
+    if request_usage is not None and kind != "summary":
+        request_usage["llm_calls"] += 1
+        request_usage["input_tokens"] += input_tokens
+        request_usage["cached_tokens"] += cached
+        request_usage["output_tokens"] += output_tokens
+
+
+def get_prompt_cache_metrics() -> Dict:
+    """Cached-token share, estimated input-cost savings and latency with / without cache hits."""
+    calls, hits = _metrics["calls"], _metrics["cache_hit_calls"]
+    input_tokens, cached = _metrics["input_tokens"], _metrics["cached_tokens"]
+    return {
+        **{k: v for k, v in _metrics.items() if not k.startswith("latency")},
+        "cached_ratio": round(cached / input_tokens, 3) if input_tokens else 0.0,
+        # Share of the input-token bill saved (cached tokens are billed at a discount)
+        "input_cost_saved_ratio": round(cached * LLM_CACHED_INPUT_DISCOUNT / input_tokens, 3) if input_tokens else 0.0,
+        "mean_latency_s_cached": round(_metrics["latency_s_cached"] / hits, 3) if hits else None,
+        "mean_latency_s_uncached": round(_metrics["latency_s_uncached"] / (calls - hits), 3) if calls > hits else None,
+        "static_prefix_tokens": _static_prefix_tokens,
+        "min_cacheable_tokens": PROMPT_CACHE_MIN_TOKENS,
+        "by_kind": {kind: dict(values) for kind, values in sorted(_by_kind.items())}
+    }
+
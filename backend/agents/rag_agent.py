@@ -3,19 +3,42 @@ RAG Agent using OpenAI's native Tool Calling (JSON-based, no parsing errors).
 Uses bind_tools for structured function calling instead of ReAct text parsing.
 """
 
-from typing import List, Dict, Any, Tuple, Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, AsyncIterator
+from langchain_core.documents import Document
+from langchain_core.messages import ToolMessage
 
-from config import LLM_MODEL, OPENAI_API_KEY
+from config import (
+    LLM_MODEL,
+    OPENAI_API_KEY,
+    BATCH_LLM_CONCURRENCY,
+    CHAT_DEADLINE_S,
+    CHAT_ANSWER_RESERVE_S
+)
 from tools.tavily_tool import get_tavily_tool
 from tools.retriever_tool import get_retriever_tool
-from memory.session_memory import get_or_create_memory
-from retrievers.hybrid_retriever import search_documents
+from memory.session_memory import get_history_messages, record_turn
+from agents.prompt_cache import (
+    cache_key,
+    note_prefix,
+    record_usage,
+    set_static_prefix,
+    track_request_usage
+)
+from outbound.provider import get_provider
+from outbound.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    set_deadline,
+    reset_deadline,
+    with_budget
+)
+from retrievers.hybrid_retriever import async_search_documents, batch_search_documents
 
 
-# System prompt for concise answers
+# System prompt for concise answers (first in every agent prompt: keep it
+# free of per-request content so the cached prefix stays byte-identical)
 SYSTEM_PROMPT = """You are FinSync Pro, a fast financial assistant.
 
 Tools:
@@ -29,19 +52,82 @@ RULES:
 4. No fluff, no explanations unless asked
 5. Just state the fact/number"""
 
+# System prompt for batch answers (retrieval already done, no tools)
+BATCH_SYSTEM_PROMPT = """You are FinSync Pro, a fast financial assistant.
+Answer the question using ONLY the document excerpts provided.
+If the excerpts don't contain the answer, say "Not found in the uploaded documents."
+Give SHORT, DIRECT answers (1-2 sentences max)."""
+
+# System prompt when the time budget runs out (no tools, answer now)
+DEADLINE_SYSTEM_PROMPT = """You are FinSync Pro, a fast financial assistant.
+Time is up: answer the question using ONLY the information gathered below.
+If it is incomplete, give the best partial answer and say what is missing.
+Give SHORT, DIRECT answers (1-2 sentences max)."""
+
+# Cached clients (created once, reused across requests)
+_llm = None
+_llm_with_tools = None
+_tools = None
+
+
+def get_llm():
+    """Get the chat model used by the agent (imported lazily, created once)."""
+    global _llm
+    if _llm is None:
+        from langchain_openai import ChatOpenAI
+        _llm = ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0,
+            openai_api_key=OPENAI_API_KEY,
+            # Retries happen in the outbound layer (see invoke_llm)
+            max_retries=0,
+        )
+    return _llm
+
 
 def get_llm_with_tools():
     """Get LLM with tools bound for structured calling."""
-    llm = ChatOpenAI(
-        model=LLM_MODEL,
-        temperature=0,
-        openai_api_key=OPENAI_API_KEY,
+    global _llm_with_tools, _tools
+    if _llm_with_tools is None:
+        # Fixed order: the tool definitions are part of the cached prompt prefix
+        _tools = [get_tavily_tool(), get_retriever_tool()]
+        
+        # Bind tools for structured JSON calling (no text parsing!)
+        _llm_with_tools = get_llm().bind_tools(_tools)
+        set_static_prefix(SYSTEM_PROMPT, _tools)
+    return _llm_with_tools, _tools
+
+
+async def invoke_llm(llm, messages, kind: str = "agent"):
+    """
+    Call a chat model under the shared LLM concurrency limit, with retries.
+    
+    kind ("agent", "batch", "deadline", "summary") picks the prompt cache key
+    and the bucket its token usage is recorded under.
+    """
+    start = time.perf_counter()
+    response = await get_provider("llm").acall(
+        lambda: llm.ainvoke(messages, prompt_cache_key=cache_key(kind))
     )
+    record_usage(kind, response, time.perf_counter() - start)
+    return response
+
+
+def build_agent_messages(session_id: str, query: str) -> List[Dict[str, str]]:
+    """
+    Agent prompt, most stable part first (see agents.prompt_cache).
     
-    tools = [get_tavily_tool(), get_retriever_tool()]
+    System prompt, then the session summary and replayed turns, then the
+    query; the bound tool definitions travel with the system prompt.
+    """
+    history = get_history_messages(session_id)
+    prefix = [{"role": "system", "content": SYSTEM_PROMPT}]
+    # Summary (if any) leads the history as a system message
+    prefix.extend(message for message in history if message["role"] == "system")
+    note_prefix(session_id, prefix)
     
-    # Bind tools for structured JSON calling (no text parsing!)
-    return llm.bind_tools(tools), tools
+    turns = [message for message in history if message["role"] != "system"]
+    return prefix + turns + [{"role": "user", "content": query}]
 
 
 def create_tool_map(tools):
@@ -49,47 +135,75 @@ def create_tool_map(tools):
     return {tool.name: tool for tool in tools}
 
 
+def document_citations(docs: List[Document]) -> List[Dict[str, Any]]:
+    """Build citation dicts for retrieved document chunks."""
+    return [
+        {
+            "source": doc.metadata.get("filename", "Unknown"),
+            "page": doc.metadata.get("page"),
+            "text": doc.page_content[:300],
+            "url": None,
+            "doc_id": doc.metadata.get("doc_id"),
+            "chunk_index": doc.metadata.get("chunk_index")
+        }
+        for doc in docs
+    ]
+
+
 async def run_agent(
     query: str,
-    session_id: str
+    session_id: str,
+    timeout_s: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     Run the RAG agent on a query using OpenAI Tool Calling.
     
+    The whole run shares one deadline. LLM and tool calls only get the
+    budget that is left (minus a reserve for writing the answer); when it
+    runs out the loop stops and answers from what the tools returned so far.
+    
     Args:
         query: User's question
         session_id: Session ID for memory
+        timeout_s: Time budget in seconds (default CHAT_DEADLINE_S)
         
     Returns:
-        Dict with answer, trace, and citations
+        Dict with answer, trace, citations, stop_reason and usage (LLM
+        tokens of this request, including cached prompt tokens)
     """
+    deadline = Deadline(timeout_s or CHAT_DEADLINE_S)
+    # Outbound calls (retries, backoff, hedges) read the deadline from context
+    token = set_deadline(deadline)
+    try:
+        with track_request_usage() as usage:
+            result = await _run_agent_loop(query, session_id, deadline)
+        return {**result, "usage": usage}
+    finally:
+        reset_deadline(token)
+
+
+async def _run_agent_loop(query: str, session_id: str, deadline: Deadline) -> Dict[str, Any]:
     llm_with_tools, tools = get_llm_with_tools()
     tool_map = create_tool_map(tools)
-    memory = get_or_create_memory(session_id)
     
-    # Get chat history from memory
-    chat_history = memory.load_memory_variables({}).get("chat_history", [])
-    
-    # Build messages with history
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    
-    # Add conversation history
-    for msg in chat_history[-10:]:  # Last 10 messages (5 turns)
-        if msg.type == "human":
-            messages.append({"role": "user", "content": msg.content})
-        else:
-            messages.append({"role": "assistant", "content": msg.content})
-    
-    # Add current query
-    messages.append({"role": "user", "content": query})
+    # System prompt, conversation history (token-capped), current query
+    messages = build_agent_messages(session_id, query)
     
     trace = set()
     citations = []
+    gathered = []  # Tool results, for a best-effort answer
     max_iterations = 5
+    stop_reason = "answered"
+    # Time kept back for writing an answer if the loop is cut short
+    reserve = min(CHAT_ANSWER_RESERVE_S, deadline.timeout_s * 0.25)
     
     for _ in range(max_iterations):
         # Call the LLM
-        response = await llm_with_tools.ainvoke(messages)
+        try:
+            response = await with_budget(invoke_llm(llm_with_tools, messages), deadline.remaining() - reserve)
+        except DeadlineExceeded:
+            stop_reason = "deadline"
+            break
         
         # Check if there are tool calls
         if not response.tool_calls:
@@ -103,6 +217,7 @@ async def run_agent(
         for tool_call in response.tool_calls:
             tool_name = tool_call["name"]
             tool_args = tool_call["args"]
+            tool_query = tool_args.get("query", tool_args.get("__arg1", ""))
             
             # Track which tools were used
             if tool_name == "web_search":
@@ -112,28 +227,35 @@ async def run_agent(
             
             # Execute the tool
             tool = tool_map.get(tool_name)
-            if tool:
+            if stop_reason == "deadline":
+                # Every tool call still needs a reply in the message history
+                messages.append(ToolMessage(
+                    content="Skipped: time budget exhausted.",
+                    tool_call_id=tool_call["id"]
+                ))
+            elif tool:
                 try:
-                    result = tool.invoke(tool_args.get("query", tool_args.get("__arg1", "")))
+                    # Async tools don't block the event loop; sync ones run in a thread
+                    result = await with_budget(tool.ainvoke(tool_query), deadline.remaining() - reserve)
                     
                     # Extract citations from document search
                     if tool_name == "document_search":
-                        docs = search_documents(tool_args.get("query", tool_args.get("__arg1", "")), k=4)
-                        for doc in docs:
-                            citations.append({
-                                "source": doc.metadata.get("filename", "Unknown"),
-                                "page": doc.metadata.get("page"),
-                                "text": doc.page_content[:300],
-                                "url": None,
-                                "doc_id": doc.metadata.get("doc_id"),
-                                "chunk_index": doc.metadata.get("chunk_index")
-                            })
+                        docs = await with_budget(async_search_documents(tool_query, k=4), deadline.remaining() - reserve)
+                        citations.extend(document_citations(docs))
                     
                     # Add tool result to messages
+                    if result:
+                        gathered.append(str(result))
                     messages.append(ToolMessage(
                         content=str(result) if result else "No results found.",
                         tool_call_id=tool_call["id"]
                     ))
+                except DeadlineExceeded:
+                    stop_reason = "deadline"
+                    messages.append(ToolMessage(
+                        content="Timed out: time budget exhausted.",
+                        tool_call_id=tool_call["id"]
+                    ))
                 except Exception as e:
                     messages.append(ToolMessage(
                         content=f"Error executing tool: {str(e)}",
@@ -144,19 +266,129 @@ async def run_agent(
                     content=f"Tool {tool_name} not found.",
                     tool_call_id=tool_call["id"]
                 ))
+        
+        if stop_reason == "deadline":
+            break
     else:
         # Max iterations reached
+        stop_reason = "max_iterations"
         final_answer = response.content if response.content else "I found some information but couldn't formulate a complete answer. Please check the sources above."
     
-    # Save to memory
-    memory.save_context(
-        {"input": query},
-        {"output": final_answer}
-    )
+    if stop_reason == "deadline":
+        print(f"⏱  Chat stopped at its {deadline.timeout_s:g}s deadline after {deadline.elapsed():.2f}s")
+        final_answer = await best_effort_answer(query, gathered, deadline)
+    
+    # Save to memory (summary updates run in the background)
+    record_turn(session_id, query, final_answer)
     
     return {
         "answer": final_answer,
         "trace": list(trace),
         "citations": citations,
-        "session_id": session_id
+        "session_id": session_id,
+        "stop_reason": stop_reason
     }
+
+
+async def best_effort_answer(query: str, gathered: List[str], deadline: Deadline) -> str:
+    """
+    Answer from whatever the tools returned before the deadline.
+    
+    Uses one LLM call if there is time left for it, otherwise falls back to
+    the first gathered result.
+    """
+    if gathered and not deadline.expired():
+        information = "\n\n".join(gathered)
+        try:
+            response = await with_budget(invoke_llm(get_llm(), [
+                {"role": "system", "content": DEADLINE_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Information gathered:\n{information}\n\nQuestion: {query}"}
+            ], kind="deadline"), deadline.remaining())
+            return response.content
+        except Exception as e:
+            print(f"Warning: Best-effort answer failed: {e}")
+    
+    if gathered:
+        return f"I ran out of time before finishing. The most relevant information I found:\n\n{gathered[0][:500]}"
+    return "I couldn't answer within the time limit. Please try again or ask a narrower question."
+
+
+async def answer_from_documents(query: str, docs: List[Document]) -> str:
+    """
+    Answer a question from already-retrieved chunks with one LLM call.
+    
+    Args:
+        query: User's question
+        docs: Retrieved document chunks
+        
+    Returns:
+        Answer text
+    """
+    excerpts = "\n\n".join(
+        f"[{i+1}] From {doc.metadata.get('filename', 'Unknown')} (Page {doc.metadata.get('page', '?')}):\n{doc.page_content}"
+        for i, doc in enumerate(docs)
+    ) or "No relevant documents found in the knowledge base."
+    
+    response = await invoke_llm(get_llm(), [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Document excerpts:\n{excerpts}\n\nQuestion: {query}"}
+    ], kind="batch")
+    return response.content
+
+
+async def retrieve_batch(queries: List[str], k: int = 4) -> List[List[Document]]:
+    """Retrieve chunks for every question in one pass (one batched embedding call, one FAISS search)."""
+    # Retrieval is blocking (embedding HTTP call + index search); keep it off the event loop
+    return await asyncio.to_thread(batch_search_documents, queries, k)
+
+
+async def run_batch_agent(
+    queries: List[str],
+    k: int = 4,
+    max_concurrency: int = BATCH_LLM_CONCURRENCY,
+    all_docs: Optional[List[List[Document]]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer many questions over the uploaded documents.
+    
+    Retrieval runs once for the whole batch (see retrieve_batch); LLM calls
+    fan out under a concurrency limit and results are yielded in
+    completion order.
+    
+    Args:
+        queries: Questions to answer
+        k: Chunks retrieved per question
+        max_concurrency: Max concurrent LLM calls
+        all_docs: Chunks per question, if already retrieved
+        
+    Yields:
+        Dict with index, query, answer, citations and error
+    """
+    if all_docs is None:
+        all_docs = await retrieve_batch(queries, k)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def answer(index: int) -> Dict[str, Any]:
+        result = {
+            "index": index,
+            "query": queries[index],
+            "answer": None,
+            "citations": [],
+            "error": None
+        }
+        async with semaphore:
+            try:
+                result["citations"] = document_citations(all_docs[index])
+                result["answer"] = await answer_from_documents(queries[index], all_docs[index])
+            except Exception as e:
+                result["error"] = str(e)
+        return result
+    
+    tasks = [asyncio.ensure_future(answer(i)) for i in range(len(queries))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop the remaining LLM calls
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,104 @@
+"""
+Chunker benchmark: RecursiveCharacterTextSplitter vs the offset chunker.
+
+Reports wall time, peak allocated memory (tracemalloc, measured in a
+separate pass so it doesn't distort timings), chunk counts and how many
+chunks come out byte-identical.
+
+Usage (from backend/):
+    python -m benchmarks.chunker_benchmark --pages 2000 --json chunker.json
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import ensure_backend_on_path, write_results
+from benchmarks.synthetic import make_pages
+
+
+def _measure(fn: Callable[[], list], repeats: int) -> Dict:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        del result
+    
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "best_s": round(min(timings), 4),
+        "mean_s": round(sum(timings) / len(timings), 4),
+        "peak_alloc_mb": round(peak / (1024 * 1024), 2),
+        "chunks": len(result),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker benchmark")
+    parser.add_argument("--pages", type=int, default=1000, help="Synthetic pages to chunk")
+    parser.add_argument("--chars-per-page", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    args = parser.parse_args()
+    
+    ensure_backend_on_path()
+    from ingestion.chunker import chunk_pages, iter_chunk_offsets
+    from ingestion.document_processor import get_text_splitter
+    
+    pages: List[Tuple[str, int]] = [
+        (text, i + 1) for i, text in enumerate(make_pages(args.seed, args.pages, args.chars_per_page))
+    ]
+    splitter = get_text_splitter()
+    
+    def recursive() -> list:
+        return [chunk for text, _ in pages for chunk in splitter.split_text(text)]
+    
+    def offsets_only() -> list:
+        return list(chunk_pages(pages))
+    
+    def offsets_materialized() -> list:
+        return [view.text for view in chunk_pages(pages)]
+    
+    results = {
+        "recursive_splitter": _measure(recursive, args.repeats),
+        "offset_views": _measure(offsets_only, args.repeats),
+        "offset_materialized": _measure(offsets_materialized, args.repeats),
+    }
+    
+    reference = recursive()
+    reference_set = set(reference)
+    produced = offsets_materialized()
+    results["agreement"] = {
+        "identical_chunks": sum(1 for chunk in produced if chunk in reference_set),
+        "recursive_chunks": len(reference),
+        "offset_chunks": len(produced),
+        "recursive_mean_chars": round(sum(map(len, reference)) / max(1, len(reference)), 1),
+        "offset_mean_chars": round(sum(map(len, produced)) / max(1, len(produced)), 1),
+        "max_offset_chars": max(
+            (end - start for text, _ in pages for start, end in iter_chunk_offsets(text)),
+            default=0,
+        ),
+    }
+    
+    base = results["recursive_splitter"]["best_s"]
+    for name in ("recursive_splitter", "offset_views", "offset_materialized"):
+        row = results[name]
+        speedup = base / row["best_s"] if row["best_s"] else float("inf")
+        print(f"{name:<22} {row['best_s']:>8.4f}s  {speedup:>5.1f}x  "
+              f"peak {row['peak_alloc_mb']:>7.2f} MB  {row['chunks']} chunks")
+    agreement = results["agreement"]
+    print(f"identical chunks: {agreement['identical_chunks']}/{agreement['offset_chunks']} "
+          f"(splitter produced {agreement['recursive_chunks']})")
+    
+    write_results(args.json, "chunker", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
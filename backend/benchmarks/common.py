@@ -0,0 +1,98 @@
+"""
+Shared helpers for the offline benchmark suite.
+Percentile summaries, machine-readable result files and path setup.
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def ensure_backend_on_path() -> None:
+    """Make the backend packages importable when run as a script."""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile.
+    
+    Args:
+        values: Sample values (any order)
+        pct: Percentile in the range 0-100
+        
+    Returns:
+        The percentile value, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize a latency sample (milliseconds) into p50/p95/p99/mean/max."""
+    if not latencies_ms:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Current git commit hash, so results can be compared across commits."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def write_results(path: Optional[str], benchmark: str, params: Dict[str, Any], results: Any) -> Dict[str, Any]:
+    """
+    Wrap results with run metadata and optionally write them as JSON.
+    
+    Args:
+        path: Output file path, or None to skip writing
+        benchmark: Benchmark name
+        params: Parameters the benchmark ran with
+        results: Benchmark-specific results
+        
+    Returns:
+        The full result payload
+    """
+    payload = {
+        "benchmark": benchmark,
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    if path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(payload, f, indent=2)
+        print(f"📄 Results written to {path}")
+    return payload
@@ -0,0 +1,373 @@
+"""
+Local stand-ins for OpenAI, Tavily and HuggingFace.
+Lets the benchmarks exercise the full request path without network or API spend.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+
+_WEB_HINTS = re.compile(r"\b(today|current|live|latest|price|news|now|rate)\b", re.IGNORECASE)
+_BOTH_HINTS = re.compile(r"\b(compare|versus|vs)\b", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure; carries an HTTP status like real client errors."""
+    
+    def __init__(self, status_code: int = 503):
+        super().__init__(f"Injected provider error ({status_code})")
+        self.status_code = status_code
+
+
+def _sample_latency(rng: random.Random, mean_s: float, jitter: float) -> float:
+    """Latency around mean_s, uniformly jittered by +/- jitter * mean_s."""
+    if mean_s <= 0:
+        return 0.0
+    return max(0.0, mean_s * (1 + rng.uniform(-jitter, jitter)))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CHAT MODEL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Tool-calling chat model with a fixed script.
+    
+    First turn: call document_search, web_search or both depending on the
+    query wording. Once tool results are present: answer from them.
+    Usage reports cache reads the way OpenAI's prefix cache would.
+    """
+    
+    latency_s: float = 0.05
+    jitter: float = 0.2
+    seed: int = 0
+    calls: int = 0
+    # Message-aligned prompt prefixes seen so far (simulated provider cache)
+    prefix_cache: set = Field(default_factory=set)
+    # Tokens of the bound tool definitions (sent ahead of the messages)
+    tool_tokens: int = 0
+    
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+    
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        
+        self.tool_tokens = len(json.dumps([convert_to_openai_tool(tool) for tool in tools])) // 4
+        return self
+    
+    def _cached_tokens(self, messages: List[BaseMessage], with_tools: bool) -> int:
+        """Longest previously seen prefix of 1024+ tokens, rounded down to 128-token steps."""
+        digest = hashlib.sha1(str(with_tools).encode("utf-8"))
+        tokens, cached = (self.tool_tokens if with_tools else 0), 0
+        for m in messages:
+            digest.update(repr((m.type, m.content, getattr(m, "tool_calls", None))).encode("utf-8"))
+            tokens += len(str(m.content)) // 4
+            key = digest.hexdigest()
+            if tokens >= 1024 and key in self.prefix_cache:
+                cached = tokens // 128 * 128
+            self.prefix_cache.add(key)
+        return cached
+    
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        tools_offered = any(
+            isinstance(m, SystemMessage) and "document_search" in str(m.content) for m in messages
+        )
+        # The fake is shared: only agent prompts are sent with the tool definitions
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4 + (self.tool_tokens if tools_offered else 0)
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": 32,
+            "total_tokens": input_tokens + 32,
+            "input_token_details": {"cache_read": min(self._cached_tokens(messages, tools_offered), input_tokens)},
+        }
+        
+        if messages and str(messages[-1].content).startswith("Update the running summary"):
+            return AIMessage(content=f"Summary of {len(messages[-1].content)} characters of history.", usage_metadata=usage)
+        
+        if messages and (isinstance(messages[-1], ToolMessage) or not tools_offered):
+            evidence = str(messages[-1].content)[:120].replace("\n", " ")
+            return AIMessage(content=f"Based on the sources: {evidence}", usage_metadata=usage)
+        
+        query = next(
+            (str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)),
+            "",
+        )
+        if _BOTH_HINTS.search(query):
+            tools = ["document_search", "web_search"]
+        elif _WEB_HINTS.search(query):
+            tools = ["web_search"]
+        else:
+            tools = ["document_search"]
+        
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": name, "args": {"query": query}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                for name in tools
+            ],
+            usage_metadata=usage,
+        )
+    
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        rng = random.Random(self.seed + self.calls)
+        time.sleep(_sample_latency(rng, self.latency_s, self.jitter))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        rng = random.Random(self.seed + self.calls)
+        await asyncio.sleep(_sample_latency(rng, self.latency_s, self.jitter))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EMBEDDINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embedder (feature hashing, L2-normalized).
+    
+    Texts sharing words land close together, so FAISS results stay meaningful.
+    A fraction of calls can fail (503) or hit a slow tail.
+    """
+    
+    def __init__(
+        self,
+        dim: int = 384,
+        latency_s: float = 0.0,
+        per_text_s: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency_s: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.latency_s = latency_s
+        self.per_text_s = per_text_s
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency_s = slow_latency_s
+        self.calls = 0
+        self.texts_embedded = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+    
+    def _simulate_call(self, count: int) -> None:
+        with self._lock:
+            self.calls += 1
+            slow = self._rng.random() < self.slow_rate
+            failed = self._rng.random() < self.error_rate
+        delay = self.latency_s + self.per_text_s * count + (self.slow_latency_s if slow else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.errors += 1
+            raise FakeProviderError(503)
+        with self._lock:
+            self.texts_embedded += count
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._simulate_call(len(texts))
+        return [self._embed(t) for t in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        self._simulate_call(1)
+        return self._embed(text)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WEB SEARCH SERVER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class FakeSearchServer:
+    """
+    Local HTTP server speaking the Tavily `/search` protocol.
+    
+    Runs in a daemon thread; latency, error rate, a slow tail and a
+    concurrency capacity (429 above it, like a provider rate limit) are
+    configurable so the real client code path (requests + JSON) is exercised.
+    """
+    
+    def __init__(
+        self,
+        latency_s: float = 0.1,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        capacity: int = 0,
+        slow_rate: float = 0.0,
+        slow_latency_s: float = 0.0,
+    ):
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.slow_rate = slow_rate
+        self.slow_latency_s = slow_latency_s
+        self.requests = 0
+        self.rejected = 0
+        self.active = 0
+        self.peak_active = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def _next_outcome(self):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            if self.capacity and self.active > self.capacity:
+                self.rejected += 1
+                return 0.0, True
+            delay = _sample_latency(self._rng, self.latency_s, self.jitter)
+            if self._rng.random() < self.slow_rate:
+                delay += self.slow_latency_s
+            failed = self._rng.random() < self.error_rate
+        return delay, failed
+    
+    def _finish(self) -> None:
+        with self._lock:
+            self.active -= 1
+    
+    def _results(self, query: str) -> Dict[str, Any]:
+        results = [
+            {
+                "title": f"Result {i + 1} for {query[:40]}",
+                "url": f"https://example.com/{i + 1}",
+                "content": f"Latest market data relevant to '{query}'. Index closed at {18000 + i * 37} points.",
+                "score": round(0.9 - i * 0.1, 2),
+            }
+            for i in range(5)
+        ]
+        return {"query": query, "answer": f"Answer for {query}", "results": results, "images": []}
+    
+    def start(self) -> "FakeSearchServer":
+        owner = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                delay, failed = owner._next_outcome()
+                try:
+                    if delay:
+                        time.sleep(delay)
+                    if failed:
+                        self.send_response(429)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    body = json.dumps(owner._results(params.get("query", ""))).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    owner._finish()
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WIRING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def install_fakes(
+    llm_latency_s: float = 0.05,
+    search_latency_s: float = 0.1,
+    embed_latency_s: float = 0.0,
+    embed_per_text_s: float = 0.0,
+    search_error_rate: float = 0.0,
+    search_capacity: int = 0,
+    search_slow_rate: float = 0.0,
+    search_slow_latency_s: float = 0.0,
+    embed_error_rate: float = 0.0,
+    embed_slow_rate: float = 0.0,
+    embed_slow_latency_s: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Point the backend at the local stand-ins.
+    
+    Must run after the backend modules are importable. Returns the fake
+    instances so callers can read their counters and stop the server.
+    """
+    from agents import rag_agent
+    from ingestion import document_processor
+    from langchain_community.utilities import tavily_search
+    
+    llm = ScriptedChatModel(latency_s=llm_latency_s, seed=seed)
+    embeddings = HashingEmbeddings(
+        latency_s=embed_latency_s,
+        per_text_s=embed_per_text_s,
+        error_rate=embed_error_rate,
+        slow_rate=embed_slow_rate,
+        slow_latency_s=embed_slow_latency_s,
+        seed=seed,
+    )
+    server = FakeSearchServer(
+        latency_s=search_latency_s,
+        error_rate=search_error_rate,
+        seed=seed,
+        capacity=search_capacity,
+        slow_rate=search_slow_rate,
+        slow_latency_s=search_slow_latency_s,
+    ).start()
+    
+    rag_agent.get_llm = lambda: llm
+    document_processor._embeddings_model = embeddings
+    tavily_search.TAVILY_API_URL = server.url
+    
+    return {"llm": llm, "embeddings": embeddings, "search_server": server}
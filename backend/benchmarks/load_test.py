@@ -0,0 +1,287 @@
+"""
+Offline end-to-end load test for /api/chat and /api/upload.
+
+Boots `main.app` in-process (ASGI transport, no sockets) with a scripted
+chat model, a local Tavily-compatible server and a hashing embedder, then
+drives a concurrent mixed workload and reports latency percentiles,
+throughput and event-loop blocking time.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --requests 400 --concurrency 32
+    python -m benchmarks.load_test --mix doc=0.6,web=0.2,both=0.1,upload=0.1 --json out.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from benchmarks.common import ensure_backend_on_path, summarize_latencies, write_results
+from benchmarks.synthetic import build_pdf, make_pages, make_query
+
+
+WEB_QUERIES = [
+    "What is the Nifty price today?",
+    "Latest RBI repo rate news",
+    "Current Sensex level",
+]
+BOTH_QUERIES = [
+    "Compare my policy premium with current market rates",
+    "My deductible vs today's industry average",
+]
+
+
+class LoopMonitor:
+    """
+    Measures event-loop blocking by timing a periodic sleep.
+    
+    Any wake-up later than `interval + threshold` counts as a stall; the
+    overshoot is accumulated as blocked time.
+    """
+    
+    def __init__(self, interval_s: float = 0.005, threshold_s: float = 0.005):
+        self.interval_s = interval_s
+        self.threshold_s = threshold_s
+        self.blocked_s = 0.0
+        self.max_stall_s = 0.0
+        self.stalls = 0
+        self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval_s)
+            lag = loop.time() - start - self.interval_s
+            if lag > self.threshold_s:
+                self.stalls += 1
+                self.blocked_s += lag
+                self.max_stall_s = max(self.max_stall_s, lag)
+    
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'doc=0.6,web=0.2,...' into normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        weights[name.strip()] = float(value)
+    unknown = set(weights) - {"doc", "web", "both", "upload"}
+    if unknown:
+        raise ValueError(f"Unknown workload types: {sorted(unknown)}")
+    total = sum(weights.values())
+    return {name: w / total for name, w in weights.items()}
+
+
+def build_workload(args, rng: random.Random) -> List[Dict]:
+    """Pre-generate the operation list so every run sees the same sequence."""
+    mix = parse_mix(args.mix)
+    names, weights = zip(*mix.items())
+    ops = []
+    for i in range(args.requests):
+        kind = rng.choices(names, weights)[0]
+        session_id = f"bench-{rng.randrange(args.sessions)}"
+        if kind == "upload":
+            pdf = build_pdf(make_pages(seed=args.seed * 100000 + i, num_pages=args.pages))
+            ops.append({"kind": kind, "pdf": pdf, "filename": f"statement_{i}.pdf"})
+        elif kind == "web":
+            ops.append({"kind": kind, "query": rng.choice(WEB_QUERIES), "session_id": session_id})
+        elif kind == "both":
+            ops.append({"kind": kind, "query": rng.choice(BOTH_QUERIES), "session_id": session_id})
+        else:
+            ops.append({"kind": kind, "query": make_query(rng), "session_id": session_id})
+    return ops
+
+
+async def execute(client, op: Dict, timeout_s: Optional[float] = None):
+    """Run one operation; returns the HTTP status code (chat stop reason goes in op)."""
+    if op["kind"] == "upload":
+        response = await client.post(
+            "/api/upload",
+            files={"file": (op["filename"], op["pdf"], "application/pdf")},
+        )
+    else:
+        payload = {"query": op["query"], "session_id": op["session_id"]}
+        if timeout_s:
+            payload["timeout_s"] = timeout_s
+        response = await client.post("/api/chat", json=payload)
+        if response.status_code == 200:
+            op["stop_reason"] = response.json().get("stop_reason")
+    return response.status_code
+
+
+async def run_load(args) -> Dict:
+    import httpx
+    import main
+    
+    rng = random.Random(args.seed)
+    seed_pdfs = [build_pdf(make_pages(seed=args.seed + i, num_pages=args.pages)) for i in range(args.seed_docs)]
+    ops = build_workload(args, rng)
+    
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    stop_reasons: Dict[str, int] = defaultdict(int)
+    transport = httpx.ASGITransport(app=main.app)
+    
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Seed the indexes so document queries have something to hit (not measured)
+            for i, pdf in enumerate(seed_pdfs):
+                await execute(client, {"kind": "upload", "pdf": pdf, "filename": f"seed_{i}.pdf"})
+            
+            queue: asyncio.Queue = asyncio.Queue()
+            for op in ops:
+                queue.put_nowait(op)
+            
+            async def worker():
+                while True:
+                    try:
+                        op = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    start = time.perf_counter()
+                    try:
+                        status = await execute(client, op, args.timeout_s)
+                    except Exception:
+                        status = 599
+                    latencies[op["kind"]].append((time.perf_counter() - start) * 1000)
+                    if status >= 400:
+                        errors[op["kind"]] += 1
+                    if op.get("stop_reason"):
+                        stop_reasons[op["stop_reason"]] += 1
+            
+            monitor = LoopMonitor()
+            monitor.start()
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall_s = time.perf_counter() - wall_start
+            await monitor.stop()
+            
+            server_metrics = (await client.get("/api/metrics")).json()
+    
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(all_latencies) / wall_s, 2) if wall_s else 0.0,
+        "overall": {**summarize_latencies(all_latencies), "errors": sum(errors.values())},
+        "by_operation": {
+            kind: {**summarize_latencies(values), "errors": errors[kind]}
+            for kind, values in sorted(latencies.items())
+        },
+        "stop_reasons": dict(stop_reasons),
+        "event_loop": {
+            "blocked_s": round(monitor.blocked_s, 3),
+            "blocked_pct": round(100 * monitor.blocked_s / wall_s, 1) if wall_s else 0.0,
+            "stalls": monitor.stalls,
+            "max_stall_ms": round(monitor.max_stall_s * 1000, 3),
+        },
+        "server_metrics": server_metrics,
+    }
+
+
+def print_report(results: Dict) -> None:
+    print(f"\n⏱  {results['overall']['count']} requests in {results['wall_s']}s "
+          f"→ {results['throughput_rps']} req/s")
+    header = f"{'operation':<10}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("─" * len(header))
+    rows = list(results["by_operation"].items()) + [("overall", results["overall"])]
+    for kind, stats in rows:
+        print(f"{kind:<10}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    if results["stop_reasons"]:
+        print("\n🛑 Stop reasons: " + ", ".join(f"{k}={v}" for k, v in sorted(results["stop_reasons"].items())))
+    loop = results["event_loop"]
+    print(f"\n🧵 Event loop blocked {loop['blocked_s']}s ({loop['blocked_pct']}% of wall time), "
+          f"{loop['stalls']} stalls, worst {loop['max_stall_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the FinSync API")
+    parser.add_argument("--requests", type=int, default=200, help="Total measured requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--mix", default="doc=0.6,web=0.2,both=0.1,upload=0.1",
+                        help="Workload weights for doc, web, both and upload")
+    parser.add_argument("--sessions", type=int, default=50, help="Distinct chat sessions")
+    parser.add_argument("--seed-docs", type=int, default=3, help="PDFs uploaded before measuring")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per synthetic PDF")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--search-latency-ms", type=float, default=100.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Fixed cost per embedding call")
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.0, help="Extra cost per embedded text")
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-capacity", type=int, default=0,
+                        help="Concurrent searches before the fake returns 429 (0 = unlimited)")
+    parser.add_argument("--search-slow-rate", type=float, default=0.0, help="Fraction of searches hitting the slow tail")
+    parser.add_argument("--search-slow-ms", type=float, default=0.0, help="Extra latency of the slow tail")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0)
+    parser.add_argument("--embed-slow-rate", type=float, default=0.0)
+    parser.add_argument("--embed-slow-ms", type=float, default=0.0)
+    parser.add_argument("--timeout-s", type=float, help="Per-request chat time budget (timeout_s)")
+    parser.add_argument("--memory-mode", choices=["window", "summary"], help="Override MEMORY_MODE")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    args = parser.parse_args()
+    
+    # Fake credentials keep client constructors happy; nothing leaves the machine
+    for key in ("OPENAI_API_KEY", "TAVILY_API_KEY", "HF_TOKEN"):
+        os.environ.setdefault(key, "offline-benchmark")
+    if args.memory_mode:
+        os.environ["MEMORY_MODE"] = args.memory_mode
+    
+    ensure_backend_on_path()
+    # Resolve output paths before leaving the caller's directory
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    workdir = tempfile.mkdtemp(prefix="finsync-load-")
+    os.chdir(workdir)  # uploads/ and vector_store/ are relative paths
+    print(f"📂 Working directory: {workdir}")
+    
+    from benchmarks.fakes import install_fakes
+    fakes = install_fakes(
+        llm_latency_s=args.llm_latency_ms / 1000,
+        search_latency_s=args.search_latency_ms / 1000,
+        embed_latency_s=args.embed_latency_ms / 1000,
+        embed_per_text_s=args.embed_per_text_ms / 1000,
+        search_error_rate=args.search_error_rate,
+        search_capacity=args.search_capacity,
+        search_slow_rate=args.search_slow_rate,
+        search_slow_latency_s=args.search_slow_ms / 1000,
+        embed_error_rate=args.embed_error_rate,
+        embed_slow_rate=args.embed_slow_rate,
+        embed_slow_latency_s=args.embed_slow_ms / 1000,
+        seed=args.seed,
+    )
+    try:
+        results = asyncio.run(run_load(args))
+    finally:
+        fakes["search_server"].stop()
+    
+    results["fakes"] = {
+        "llm_calls": fakes["llm"].calls,
+        "embedding_calls": fakes["embeddings"].calls,
+        "texts_embedded": fakes["embeddings"].texts_embedded,
+        "embedding_errors": fakes["embeddings"].errors,
+        "search_requests": fakes["search_server"].requests,
+        "search_rejected": fakes["search_server"].rejected,
+        "search_peak_concurrency": fakes["search_server"].peak_active,
+    }
+    print_report(results)
+    write_results(args.json, "load_test", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
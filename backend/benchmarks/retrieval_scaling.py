@@ -0,0 +1,216 @@
+"""
+Retrieval scaling benchmark: 1k to 1M chunks.
+
+For each corpus size, a fresh subprocess builds the indexes through the
+real module functions (`initialize_vector_store`, `update_bm25_corpus`),
+then measures incremental add time, FAISS / BM25 / hybrid query latency,
+resident memory and on-disk size. Embeddings are deterministic random
+vectors so the numbers reflect indexing and search, not the embedder.
+
+Usage (from backend/):
+    python -m benchmarks.retrieval_scaling --sizes 1000,10000,100000 --json scaling.json
+    python -m benchmarks.retrieval_scaling --sizes 1000000 --budget-s 1800
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import BACKEND_DIR, ensure_backend_on_path, summarize_latencies, write_results
+from benchmarks.synthetic import make_query, make_sentence
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc, falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+def dir_size_mb(path: Path) -> float:
+    """Total size of files under path in MB."""
+    if not path.exists():
+        return 0.0
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / (1024 * 1024)
+
+
+def _random_vector_embeddings(dim: int = 384):
+    """Embeddings returning deterministic unit vectors seeded from each text's CRC32."""
+    import numpy as np
+    from langchain_core.embeddings import Embeddings
+    
+    class RandomVectorEmbeddings(Embeddings):
+        def _embed(self, text: str):
+            vector = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(dim)
+            return (vector / np.linalg.norm(vector)).astype("float32").tolist()
+        
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            return [self._embed(t) for t in texts]
+        
+        def embed_query(self, text: str) -> List[float]:
+            return self._embed(text)
+    
+    return RandomVectorEmbeddings()
+
+
+def make_chunks(count: int, chunk_chars: int, seed: int, doc_offset: int = 0):
+    """Synthetic chunk Documents, grouped 50 to a document like real uploads."""
+    from langchain_core.documents import Document
+    
+    rng = random.Random(seed)
+    pool = [make_sentence(rng) for _ in range(5000)]
+    sentences_per_chunk = max(1, chunk_chars // 90)
+    documents = []
+    for i in range(count):
+        doc_number = doc_offset + i // 50
+        documents.append(Document(
+            page_content=" ".join(rng.choices(pool, k=sentences_per_chunk)),
+            metadata={
+                "doc_id": f"doc-{doc_number}",
+                "filename": f"statement_{doc_number}.pdf",
+                "page": (i % 50) // 5 + 1,
+                "chunk_index": i % 50,
+                "source": f"statement_{doc_number}.pdf",
+            },
+        ))
+    return documents
+
+
+def time_queries(fn, queries: List[str]) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize_latencies(latencies)
+
+
+def measure_size(size: int, args) -> Dict:
+    """Run all measurements for one corpus size in the current process."""
+    ensure_backend_on_path()
+    from ingestion import document_processor
+    from retrievers import hybrid_retriever, retrieval_cache, vector_store
+    
+    document_processor._embeddings_model = _random_vector_embeddings()
+    # Repeated queries would otherwise time retrieval-cache hits, not searches
+    retrieval_cache._cache = retrieval_cache.RetrievalCache(capacity=0)
+    rss_start = current_rss_mb()
+    
+    start = time.perf_counter()
+    documents = make_chunks(size, args.chunk_chars, args.seed)
+    generate_s = time.perf_counter() - start
+    rss_corpus = current_rss_mb()
+    
+    start = time.perf_counter()
+    vector_store.initialize_vector_store(documents)
+    build_faiss_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    hybrid_retriever.update_bm25_corpus(documents)
+    build_bm25_s = time.perf_counter() - start
+    del documents
+    rss_indexed = current_rss_mb()
+    
+    # Incremental add: one more upload-sized batch through the upload path
+    batch = make_chunks(args.add_batch, args.chunk_chars, args.seed + 1, doc_offset=size // 50 + 1)
+    start = time.perf_counter()
+    vector_store.add_documents(batch)
+    add_faiss_s = time.perf_counter() - start
+    start = time.perf_counter()
+    hybrid_retriever.update_bm25_corpus(batch)
+    add_bm25_s = time.perf_counter() - start
+    
+    rng = random.Random(args.seed)
+    queries = [make_query(rng) for _ in range(args.queries)]
+    faiss_retriever = vector_store.get_retriever(k=4)
+    bm25_retriever = hybrid_retriever.get_bm25_retriever(k=4)
+    hybrid_retriever.search_documents(queries[0])  # first-call costs stay outside the timings
+    
+    return {
+        "size": size,
+        "generate_s": round(generate_s, 3),
+        "build_faiss_s": round(build_faiss_s, 3),
+        "build_bm25_s": round(build_bm25_s, 3),
+        "add_batch": args.add_batch,
+        "add_faiss_s": round(add_faiss_s, 4),
+        "add_bm25_s": round(add_bm25_s, 4),
+        "query_faiss": time_queries(faiss_retriever.invoke, queries),
+        "query_bm25": time_queries(bm25_retriever.invoke, queries),
+        "query_hybrid": time_queries(hybrid_retriever.search_documents, queries),
+        "rss_corpus_mb": round(rss_corpus - rss_start, 1),
+        "rss_indexes_mb": round(rss_indexed - rss_start, 1),
+        "rss_total_mb": round(current_rss_mb(), 1),
+        "disk_mb": round(dir_size_mb(Path(vector_store.VECTOR_STORE_DIR)), 2),
+    }
+
+
+def run_child(size: int, args) -> Dict:
+    """Measure one size in a fresh interpreter so memory numbers don't leak across sizes."""
+    cmd = [
+        sys.executable, "-m", "benchmarks.retrieval_scaling",
+        "--only-size", str(size),
+        "--chunk-chars", str(args.chunk_chars),
+        "--queries", str(args.queries),
+        "--add-batch", str(args.add_batch),
+        "--seed", str(args.seed),
+    ]
+    output = subprocess.run(cmd, cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval scaling benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Comma-separated chunk counts")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Approximate characters per chunk")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per retriever")
+    parser.add_argument("--add-batch", type=int, default=100, help="Chunks in the incremental add")
+    parser.add_argument("--budget-s", type=float, default=900.0,
+                        help="Skip larger sizes once one size takes longer than this")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write machine-readable results to this path")
+    parser.add_argument("--only-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.only_size is not None:
+        os.chdir(tempfile.mkdtemp(prefix="finsync-scaling-"))
+        print(json.dumps(measure_size(args.only_size, args)))
+        return
+    
+    results = []
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        if results and results[-1].get("elapsed_s", 0) > args.budget_s:
+            results.append({"size": size, "skipped": f"previous size exceeded {args.budget_s}s budget"})
+            continue
+        if results and "skipped" in results[-1]:
+            results.append({"size": size, "skipped": results[-1]["skipped"]})
+            continue
+        print(f"📊 Measuring {size:,} chunks...", flush=True)
+        start = time.perf_counter()
+        row = run_child(size, args)
+        row["elapsed_s"] = round(time.perf_counter() - start, 1)
+        results.append(row)
+        print(f"   build faiss {row['build_faiss_s']}s, bm25 {row['build_bm25_s']}s | "
+              f"add faiss {row['add_faiss_s']}s, bm25 {row['add_bm25_s']}s | "
+              f"p95 faiss {row['query_faiss']['p95_ms']}ms, bm25 {row['query_bm25']['p95_ms']}ms, "
+              f"hybrid {row['query_hybrid']['p95_ms']}ms | "
+              f"rss +{row['rss_indexes_mb']}MB, disk {row['disk_mb']}MB", flush=True)
+    
+    params = {k: v for k, v in vars(args).items() if k != "only_size"}
+    write_results(args.json, "retrieval_scaling", params, results)
+
+
+if __name__ == "__main__":
+    main()
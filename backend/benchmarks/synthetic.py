@@ -0,0 +1,145 @@
+"""
+Synthetic financial documents for benchmarks.
+Deterministic page text and a minimal PDF writer (no extra dependencies).
+"""
+
+import random
+from typing import List
+
+
+_SUBJECTS = [
+    "The policyholder", "The insured", "The company", "The account holder",
+    "The borrower", "The nominee", "The fund manager", "The issuer",
+]
+_VERBS = [
+    "shall pay", "is entitled to", "must disclose", "may claim",
+    "will receive", "agrees to maintain", "is liable for", "may withdraw",
+]
+_OBJECTS = [
+    "an annual premium of Rs. {n}", "a sum assured of Rs. {n} lakh",
+    "a deductible of {n} percent", "interest at {n} basis points above repo",
+    "a grace period of {n} days", "a lock-in period of {n} months",
+    "a surrender charge of {n} percent", "a monthly installment of Rs. {n}",
+]
+_CLAUSES = [
+    "subject to the terms of Section {s}", "as per the schedule in Annexure {s}",
+    "under Regulation {s} of the Act", "unless otherwise stated in Clause {s}",
+    "in accordance with IRDAI circular {s}", "for the financial year 20{s}",
+]
+_HEADINGS = [
+    "Coverage Details", "Exclusions", "Premium Schedule", "Claims Procedure",
+    "Tax Benefits", "Nomination", "Loan Against Policy", "Free Look Period",
+]
+
+QUERY_TERMS = [
+    "premium", "sum assured", "deductible", "grace period", "lock-in",
+    "surrender charge", "exclusions", "claims procedure", "tax benefits",
+    "nomination", "interest rate", "free look period",
+]
+
+
+def make_sentence(rng: random.Random) -> str:
+    """Build one policy-style sentence."""
+    obj = rng.choice(_OBJECTS).format(n=rng.randint(1, 999))
+    clause = rng.choice(_CLAUSES).format(s=rng.randint(1, 99))
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {obj}, {clause}."
+
+
+def make_page_text(rng: random.Random, target_chars: int = 2500) -> str:
+    """
+    Build one page of text with headings, paragraphs and line breaks.
+    
+    Args:
+        rng: Seeded random generator
+        target_chars: Approximate page length
+        
+    Returns:
+        Page text
+    """
+    parts: List[str] = []
+    length = 0
+    while length < target_chars:
+        heading = rng.choice(_HEADINGS)
+        lines = []
+        for _ in range(rng.randint(2, 5)):
+            lines.append(" ".join(make_sentence(rng) for _ in range(rng.randint(1, 3))))
+        block = heading + "\n" + "\n".join(lines)
+        parts.append(block)
+        length += len(block) + 2
+    return "\n\n".join(parts)
+
+
+def make_pages(seed: int, num_pages: int, chars_per_page: int = 2500) -> List[str]:
+    """Build a deterministic list of page texts."""
+    rng = random.Random(seed)
+    return [make_page_text(rng, chars_per_page) for _ in range(num_pages)]
+
+
+def make_query(rng: random.Random) -> str:
+    """Build a document-style question."""
+    term = rng.choice(QUERY_TERMS)
+    return rng.choice([
+        f"What is the {term} in my policy?",
+        f"Explain the {term} clause in my document",
+        f"How much is the {term} according to my uploaded policy?",
+    ])
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[str]) -> bytes:
+    """
+    Write a minimal text-only PDF that pypdf can extract.
+    
+    Args:
+        pages: Text for each page (newlines become separate lines)
+        
+    Returns:
+        PDF file bytes
+    """
+    objects: List[bytes] = []
+    
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+    
+    catalog_id = add(b"")  # placeholder, filled in below
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    
+    page_ids = []
+    for text in pages:
+        lines = [b"BT /F1 9 Tf 11 TL 36 806 Td"]
+        for line in text.split("\n"):
+            safe = _pdf_escape(line).encode("latin-1", "replace")
+            lines.append(b"(" + safe + b") Tj T*")
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+    
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n" % (len(objects) + 1)
+    out += b"0000000000 65535 f \n"
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(out)
@@ -20,6 +20,19 @@ HF_TOKEN = os.getenv("HF_TOKEN")  # HuggingFace Inference API token
 # ═══════════════════════════════════════════════════════════════════════════════
 LLM_MODEL = "gpt-4o-mini"  # Fast model for quick responses
 LLM_TEMPERATURE = 0
+# Provider-side prompt caching: prefixes from this size on are cached, and
+# cached input tokens are billed at a discount (0.5 = half price)
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_KEY_PREFIX = "finsync"   # prompt_cache_key = "<prefix>:<prompt kind>"
+LLM_CACHED_INPUT_DISCOUNT = 0.5
+PROMPT_CACHE_TRACKED_SESSIONS = 10000  # Sessions whose last prefix is remembered (LRU)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CHAT DEADLINE SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", "30"))  # Time budget per /api/chat request
+CHAT_MAX_DEADLINE_S = 120       # Cap on a per-request timeout_s
+CHAT_ANSWER_RESERVE_S = 3.0     # Budget kept back for a best-effort answer (max 25% of the total)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # RETRIEVER WEIGHTS (Hybrid Search - must sum to 1.0)
@@ -28,21 +41,87 @@ FAISS_WEIGHT = 0.5              # Semantic search weight
 BM25_WEIGHT = 0.5               # Keyword search weight
 RRF_K = 60                      # Reciprocal Rank Fusion constant
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# INDEX SNAPSHOT SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Each index write publishes a new immutable snapshot; new vectors go into a
+# fresh FAISS segment instead of copying the whole index, and small segments
+# are merged log-structured style (a save compacts them into one)
+FAISS_MAX_SEGMENTS = 8          # Segments searched per query before a forced merge
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RETRIEVAL CACHE SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+RETRIEVAL_CACHE_SIZE = 1024     # Cached (query, k) results per index version (0 disables)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # CHUNKING SETTINGS
 # ═══════════════════════════════════════════════════════════════════════════════
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+CHUNKER = os.getenv("CHUNKER", "offset")  # "offset" (single pass) or "recursive" (LangChain splitter)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BATCH CHAT SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+BATCH_MAX_QUERIES = 500         # Max questions per /api/chat/batch request
+BATCH_LLM_CONCURRENCY = 8       # Concurrent LLM calls per batch
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BULK INGESTION SETTINGS (python -m ingestion.bulk_ingest)
+# ═══════════════════════════════════════════════════════════════════════════════
+BULK_EMBED_WORKERS = 4          # Concurrent embedding requests
+BULK_COMMIT_FILES = 64          # Files added to the in-memory indexes per commit
+BULK_CHECKPOINT_FILES = 1000    # Files between index saves + manifest checkpoints
+BULK_MANIFEST_FILE = "bulk_ingest_manifest.json"  # Stored in VECTOR_STORE_DIR
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RE-INDEX SETTINGS (python -m ingestion.reindex)
+# ═══════════════════════════════════════════════════════════════════════════════
+SIDECAR_SUFFIX = ".pages.json.gz"  # Extracted-text sidecar saved next to each PDF
+BULK_SIDECAR_DIR = "bulk"          # Sidecars of bulk-ingested PDFs (under UPLOAD_DIR)
+REINDEX_EMBED_BATCH = 256          # Texts per embedding request when re-indexing
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # MEMORY SETTINGS
 # ═══════════════════════════════════════════════════════════════════════════════
 MEMORY_WINDOW_K = 5             # Last K conversation turns
+MEMORY_MODE = os.getenv("MEMORY_MODE", "window")  # "window" (last K turns) or "summary" (rolling summary + recent turns)
+SUMMARY_RECENT_TURNS = 2        # Turns kept verbatim next to the rolling summary
+SUMMARY_FOLD_TURNS = 3          # Evicted turns collected before the summary is rewritten (keeps the prompt prefix stable)
+MEMORY_MAX_HISTORY_TOKENS = 2000  # Hard cap on replayed history in summary mode (approx. tokens)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # EMBEDDING SETTINGS (Free HuggingFace model)
 # ═══════════════════════════════════════════════════════════════════════════════
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # Free, fast, 384 dims
+EMBED_BATCH_MAX_SIZE = 32       # Max queries embedded per micro-batch (1 disables batching)
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))  # Collection window per micro-batch
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OUTBOUND CALL SETTINGS (LLM, web search, embeddings)
+# ═══════════════════════════════════════════════════════════════════════════════
+OUTBOUND_MAX_RETRIES = 3        # Retries for 429 / 5xx / connection errors
+OUTBOUND_BACKOFF_BASE_S = 0.2   # Full-jitter backoff: uniform(0, base * 2^attempt)
+OUTBOUND_BACKOFF_MAX_S = 5.0
+OUTBOUND_HEDGING = os.getenv("OUTBOUND_HEDGING", "true").lower() in ("1", "true", "yes")
+OUTBOUND_HEDGE_PERCENTILE = 95  # Hedge idempotent calls slower than this recent percentile
+# Web searches are billed per request, so hedging them is opt-in
+OUTBOUND_HEDGE_WEB_SEARCH = os.getenv("OUTBOUND_HEDGE_WEB_SEARCH", "false").lower() in ("1", "true", "yes")
+OUTBOUND_PROVIDERS = {
+    # Concurrency starts at initial_limit and adapts (AIMD) up to max_limit;
+    # calls slower than latency_target_s count as overload, except batch_kinds
+    # (latency grows with input size). hedge lists the call kinds hedged.
+    "llm": {"initial_limit": 16, "max_limit": 64, "latency_target_s": 20.0, "hedge": ()},
+    "web_search": {
+        "initial_limit": 8, "max_limit": 32, "latency_target_s": 8.0,
+        "hedge": ("search",) if OUTBOUND_HEDGE_WEB_SEARCH else ()
+    },
+    "embeddings": {
+        "initial_limit": 8, "max_limit": 32, "latency_target_s": 5.0,
+        "hedge": ("query",), "batch_kinds": ("documents", "query_batch")
+    },
+}
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SERVER SETTINGS
@@ -51,6 +130,24 @@ HOST = "0.0.0.0"
 PORT = 8000
 CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# STARTUP SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Opt-in: load persisted indexes, create clients and run one dummy retrieval
+# before /ready reports ready (liveness on /health is unaffected)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ADMIN & PROFILING SETTINGS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Admin endpoints (/api/admin/*, ?profile=1) need this token in X-Admin-Token;
+# without one configured they are disabled, and so is continuous profiling
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILER_CONTINUOUS_HZ = float(os.getenv("PROFILER_CONTINUOUS_HZ", "0"))  # Always-on sampling rate (0 = off)
+PROFILER_REQUEST_HZ = 200       # Sampling rate while a ?profile=1 request runs
+PROFILER_MAX_STACKS = 20000     # Distinct stacks kept per profile (beyond: counted as truncated)
+PROFILER_KEEP_PROFILES = 20     # Finished per-request profiles kept for download
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # STORAGE PATHS
 # ═══════════════════════════════════════════════════════════════════════════════
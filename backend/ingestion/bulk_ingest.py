@@ -0,0 +1,286 @@
+"""
+Bulk PDF ingestion for large document collections.
+
+PDFs are parsed and chunked in worker processes (same process_document()
+as the upload endpoint), embedded by a pool of threads, added to the
+indexes a batch of files at a time and saved once per checkpoint instead
+of once per file. A manifest records every finished file, so an
+interrupted run picks up where it stopped. Extracted-text sidecars go to
+UPLOAD_DIR/BULK_SIDECAR_DIR rather than into the source directory.
+
+Run it while the API server is stopped (or restart the server afterwards):
+the server only reads the persisted indexes at startup / first search.
+
+Usage (from backend/):
+    python -m ingestion.bulk_ingest ./statements --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from config import (
+    UPLOAD_DIR,
+    VECTOR_STORE_DIR,
+    BULK_EMBED_WORKERS,
+    BULK_COMMIT_FILES,
+    BULK_CHECKPOINT_FILES,
+    BULK_MANIFEST_FILE,
+    BULK_SIDECAR_DIR,
+    SIDECAR_SUFFIX
+)
+from ingestion.document_processor import process_document, get_embeddings
+from retrievers.vector_store import (
+    add_documents,
+    initialize_vector_store,
+    save_vector_store
+)
+
+
+MANIFEST_VERSION = 1
+
+
+def find_pdfs(directory: str) -> List[Path]:
+    """List PDFs under a directory (recursive, sorted for a stable order)."""
+    return sorted(
+        path for path in Path(directory).rglob("*")
+        if path.suffix.lower() == ".pdf" and path.is_file()
+    )
+
+
+def _fingerprint(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def bulk_sidecar_path(key: str, name: str) -> Path:
+    """Sidecar location for a bulk-ingested PDF (unique per source path)."""
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return Path(UPLOAD_DIR) / BULK_SIDECAR_DIR / f"{digest}_{name}{SIDECAR_SUFFIX}"
+
+
+def load_manifest(path: Path) -> Dict:
+    """Load the ingestion manifest, or start an empty one."""
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(path: Path, manifest: Dict) -> None:
+    """Write the manifest atomically (a crash never leaves it half-written)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _embed(documents: List[Document]) -> List[List[float]]:
+    return get_embeddings().embed_documents([doc.page_content for doc in documents])
+
+
+def ingest_directory(
+    directory: str,
+    workers: Optional[int] = None,
+    embed_workers: int = BULK_EMBED_WORKERS,
+    commit_files: int = BULK_COMMIT_FILES,
+    checkpoint_files: int = BULK_CHECKPOINT_FILES,
+    manifest_path: Optional[Path] = None,
+    retry_failed: bool = True
+) -> Dict:
+    """
+    Ingest every PDF under a directory, skipping files already done.
+    
+    Args:
+        directory: Directory to scan for PDFs
+        workers: Parser processes (default: CPU count)
+        embed_workers: Concurrent embedding requests
+        commit_files: Files added to the in-memory indexes per commit
+        checkpoint_files: Files between index saves and manifest writes
+        manifest_path: Manifest location (default: in VECTOR_STORE_DIR)
+        retry_failed: Retry files that failed in an earlier run
+        
+    Returns:
+        Run statistics
+    """
+    manifest_path = manifest_path or Path(VECTOR_STORE_DIR) / BULK_MANIFEST_FILE
+    manifest = load_manifest(manifest_path)
+    finished = manifest["files"]
+    
+    todo: List[Tuple[Path, str, Dict[str, int]]] = []
+    skipped = 0
+    for path in find_pdfs(directory):
+        key = str(path.resolve())
+        fingerprint = _fingerprint(path)
+        entry = finished.get(key)
+        if entry and entry["size"] == fingerprint["size"] and entry["mtime_ns"] == fingerprint["mtime_ns"]:
+            if entry["status"] == "done" or not retry_failed:
+                skipped += 1
+                continue
+        elif entry and entry["status"] == "done":
+            # No per-document delete yet: the old chunks stay indexed
+            print(f"Warning: {path} changed since it was ingested; indexing it again")
+        todo.append((path, key, fingerprint))
+    
+    stats = {
+        "files_found": len(todo) + skipped,
+        "files_skipped": skipped,
+        "files_done": 0,
+        "files_failed": 0,
+        "chunks": 0,
+        "checkpoints": 0,
+        "interrupted": False,
+        "elapsed_s": 0.0
+    }
+    print(f"📂 {stats['files_found']} PDFs found, {skipped} already ingested, {len(todo)} to go")
+    if not todo:
+        return stats
+    
+    # Append to the persisted indexes rather than starting new ones
+    initialize_vector_store()
+    
+    start = time.perf_counter()
+    # Parsed + embedded, waiting to be added to the indexes
+    ready: List[Tuple[str, Dict, List[Document], List[List[float]]]] = []
+    # Added to the in-memory indexes (or failed), not yet checkpointed
+    unsaved: Dict[str, Dict] = {}
+    since_checkpoint = 0
+    
+    def commit() -> None:
+        nonlocal since_checkpoint
+        if not ready:
+            return
+        documents = [doc for _, _, docs, _ in ready for doc in docs]
+        vectors = [vector for _, _, _, file_vectors in ready for vector in file_vectors]
+        add_documents(documents, vectors=vectors, persist=False)
+        for key, entry, _, _ in ready:
+            unsaved[key] = entry
+        stats["files_done"] += len(ready)
+        stats["chunks"] += len(documents)
+        since_checkpoint += len(ready)
+        ready.clear()
+    
+    def checkpoint() -> None:
+        nonlocal since_checkpoint
+        if not unsaved:
+            return
+        # Indexes first: the manifest must never claim files the indexes lack
+        save_vector_store()
+        finished.update(unsaved)
+        save_manifest(manifest_path, manifest)
+        unsaved.clear()
+        since_checkpoint = 0
+        stats["checkpoints"] += 1
+        elapsed = time.perf_counter() - start
+        processed = stats["files_done"] + stats["files_failed"]
+        print(
+            f"💾 {processed}/{len(todo)} files, {stats['chunks']} chunks, "
+            f"{processed / elapsed:.1f} files/s"
+        )
+    
+    def fail(key: str, fingerprint: Dict[str, int], error: Exception) -> None:
+        stats["files_failed"] += 1
+        unsaved[key] = {**fingerprint, "status": "error", "error": str(error)}
+        print(f"❌ {key}: {error}")
+    
+    workers = workers or os.cpu_count() or 1
+    parsers = ProcessPoolExecutor(max_workers=workers)
+    embedders = ThreadPoolExecutor(max_workers=embed_workers)
+    max_in_flight = 2 * (workers + embed_workers)
+    parsing: Dict[Future, Tuple[Path, str, Dict[str, int]]] = {}
+    embedding: Dict[Future, Tuple[str, Dict[str, int], str, List[Document]]] = {}
+    queue = iter(todo)
+    
+    try:
+        while True:
+            # Bounded look-ahead keeps parsed chunks and vectors from piling up
+            while len(parsing) + len(embedding) < max_in_flight:
+                item = next(queue, None)
+                if item is None:
+                    break
+                path, key, fingerprint = item
+                sidecar = str(bulk_sidecar_path(key, path.name))
+                parsing[parsers.submit(process_document, str(path), path.name, sidecar)] = item
+            
+            if not parsing and not embedding:
+                break
+            
+            done, _ = wait([*parsing, *embedding], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in parsing:
+                    path, key, fingerprint = parsing.pop(future)
+                    try:
+                        doc_id, documents = future.result()
+                    except Exception as e:
+                        fail(key, fingerprint, e)
+                        continue
+                    embedding[embedders.submit(_embed, documents)] = (key, fingerprint, doc_id, documents)
+                else:
+                    key, fingerprint, doc_id, documents = embedding.pop(future)
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        fail(key, fingerprint, e)
+                        continue
+                    entry = {**fingerprint, "status": "done", "doc_id": doc_id, "chunks": len(documents)}
+                    ready.append((key, entry, documents, vectors))
+            
+            if len(ready) >= commit_files:
+                commit()
+            if since_checkpoint >= checkpoint_files:
+                checkpoint()
+    except KeyboardInterrupt:
+        stats["interrupted"] = True
+        print("Interrupted: saving finished files (run again to resume)")
+    finally:
+        parsers.shutdown(wait=False, cancel_futures=True)
+        embedders.shutdown(wait=False, cancel_futures=True)
+    
+    commit()
+    checkpoint()
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDFs")
+    parser.add_argument("directory", help="Directory to scan for PDFs (recursive)")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--embed-workers", type=int, default=BULK_EMBED_WORKERS)
+    parser.add_argument("--commit-files", type=int, default=BULK_COMMIT_FILES,
+                        help="Files added to the indexes per commit")
+    parser.add_argument("--checkpoint-files", type=int, default=BULK_CHECKPOINT_FILES,
+                        help="Files between index saves (one save at the end if larger than the run)")
+    parser.add_argument("--manifest", type=Path, default=None,
+                        help=f"Manifest path (default: {VECTOR_STORE_DIR}/{BULK_MANIFEST_FILE})")
+    parser.add_argument("--skip-failed", action="store_true", help="Don't retry files that failed before")
+    args = parser.parse_args()
+    
+    stats = ingest_directory(
+        args.directory,
+        workers=args.workers,
+        embed_workers=args.embed_workers,
+        commit_files=args.commit_files,
+        checkpoint_files=args.checkpoint_files,
+        manifest_path=args.manifest,
+        retry_failed=not args.skip_failed
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
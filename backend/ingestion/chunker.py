@@ -0,0 +1,149 @@
+"""
+Offset-based Chunker.
+Single linear pass per page producing (page, start, end) spans into the page text.
+Same separator priorities and overlap semantics as the recursive splitter,
+but chunk text is only sliced out when it is actually needed. The upload
+path still builds a Document per chunk (embedding and the chunk store take
+the whole list); streaming consumers such as the chunker benchmark are the
+ones that avoid holding every chunk's text.
+"""
+
+from typing import Iterator, List, Sequence, Tuple
+
+from config import CHUNK_SIZE, CHUNK_OVERLAP
+
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+class ChunkView:
+    """
+    Lazy view of one chunk: a reference to the page text plus offsets.
+    
+    No text is copied until `text` is read.
+    """
+    
+    __slots__ = ("page_text", "page", "start", "end")
+    
+    def __init__(self, page_text: str, page: int, start: int, end: int):
+        self.page_text = page_text
+        self.page = page
+        self.start = start
+        self.end = end
+    
+    @property
+    def text(self) -> str:
+        """Materialize the chunk text."""
+        return self.page_text[self.start:self.end]
+    
+    def __len__(self) -> int:
+        return self.end - self.start
+    
+    def __repr__(self) -> str:
+        return f"ChunkView(page={self.page}, start={self.start}, end={self.end})"
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Shrink [start, end) to exclude leading and trailing whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _find_cut(text: str, start: int, window_end: int, separators: Sequence[str]) -> Tuple[int, str]:
+    """Position of the highest-priority separator inside (start, window_end), and which one."""
+    for sep in separators:
+        if not sep:
+            break
+        pos = text.rfind(sep, start + 1, window_end)
+        if pos > start:
+            return pos, sep
+    return window_end, ""
+
+
+def iter_chunk_offsets(
+    text: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    separators: Sequence[str] = SEPARATORS
+) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of chunks of text.
+    
+    Each chunk ends just before the highest-priority separator that fits in
+    the chunk_size window (separators stay at the start of the next chunk,
+    like keep_separator="start"). The next chunk starts at the earliest
+    occurrence of that same separator within the last chunk_overlap
+    characters, so overlap is made of whole pieces at the level used to cut.
+    Overlap is dropped when it would leave no room to get past the cut, and
+    a span lying entirely inside the previous chunk (e.g. an overlap tail
+    followed only by whitespace) is not yielded.
+    
+    Args:
+        text: Page text
+        chunk_size: Maximum chunk length in characters
+        chunk_overlap: Maximum overlap between consecutive chunks
+        separators: Separators in priority order ("" = hard cut)
+        
+    Yields:
+        (start, end) offsets with surrounding whitespace stripped
+    """
+    n = len(text)
+    start = 0
+    cut = used = None
+    # End of the last yielded chunk (spans start strictly later)
+    last_end = 0
+    
+    while start < n:
+        if start + chunk_size >= n:
+            s, e = _strip_span(text, start, n)
+            if e > s and e > last_end:
+                yield s, e
+            return
+        
+        if cut is None:
+            cut, used = _find_cut(text, start, start + chunk_size, separators)
+        
+        s, e = _strip_span(text, start, cut)
+        if e > s and e > last_end:
+            yield s, e
+            last_end = e
+        
+        # Overlap: back up to the earliest same-level boundary within reach
+        next_start, next_cut = cut, None
+        if chunk_overlap > 0:
+            lo = max(cut - chunk_overlap, start + 1)
+            pos = text.find(used, lo, cut) if used else lo
+            if pos != -1 and pos < cut:
+                if pos + chunk_size >= n:
+                    next_start = pos
+                else:
+                    candidate = _find_cut(text, pos, pos + chunk_size, separators)
+                    if candidate[0] > cut:
+                        next_start, next_cut = pos, candidate
+        
+        start = next_start
+        cut, used = next_cut if next_cut is not None else (None, None)
+
+
+def chunk_pages(
+    pages: List[Tuple[str, int]],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP
+) -> Iterator[ChunkView]:
+    """
+    Chunk extracted pages into lazy views, one page at a time.
+    
+    Args:
+        pages: List of (text, page_number) tuples from extract_text_from_pdf
+        chunk_size: Maximum chunk length in characters
+        chunk_overlap: Maximum overlap between consecutive chunks
+        
+    Yields:
+        ChunkViews in document order
+    """
+    for page_text, page_number in pages:
+        for start, end in iter_chunk_offsets(page_text, chunk_size, chunk_overlap):
+            yield ChunkView(page_text, page_number, start, end)
@@ -1,36 +1,81 @@
 """
 Document Processing Pipeline.
 Handles PDF ingestion, chunking, and embedding generation.
+
+The per-page text extracted from each PDF is kept in a gzip'd JSON sidecar
+next to it, so chunks and indexes can be rebuilt (python -m ingestion.reindex)
+without parsing the PDF again.
 """
 
+import gzip
+import json
 import os
 import uuid
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 
-from pypdf import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+if TYPE_CHECKING:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from config import (
     CHUNK_SIZE,
     CHUNK_OVERLAP,
+    CHUNKER,
     EMBEDDING_MODEL,
+    EMBED_BATCH_MAX_SIZE,
     HF_TOKEN,
-    UPLOAD_DIR
+    UPLOAD_DIR,
+    SIDECAR_SUFFIX
 )
+from ingestion.chunker import chunk_pages
+from outbound.provider import get_provider
+
 
+SIDECAR_VERSION = 1
 
 # Document status tracking
 _document_status: Dict[str, Dict] = {}
 
 # Cache embeddings model (loads once)
 _embeddings_model = None
+_guarded_embeddings = None
 
 
-def get_text_splitter() -> RecursiveCharacterTextSplitter:
+class GuardedEmbeddings(Embeddings):
+    """Embeddings client whose calls go through the outbound layer (limits, retries, hedging)."""
+    
+    def __init__(self, client: Embeddings):
+        self.client = client
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_provider("embeddings").call(
+            lambda: self.client.embed_documents(texts), idempotent=True, kind="documents"
+        )
+    
+    def embed_query(self, text: str) -> List[float]:
+        return get_provider("embeddings").call(lambda: self.client.embed_query(text), idempotent=True, kind="query")
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed search queries in one request.
+        
+        Up to EMBED_BATCH_MAX_SIZE queries (a micro-batch) is a "query" call,
+        hedged like embed_query; larger batches (batch chat) are a
+        "query_batch" call, which is never hedged and isn't an overload signal.
+        """
+        kind = "query" if len(texts) <= EMBED_BATCH_MAX_SIZE else "query_batch"
+        return get_provider("embeddings").call(
+            lambda: self.client.embed_documents(texts), idempotent=True, kind=kind
+        )
+
+
+def get_text_splitter() -> "RecursiveCharacterTextSplitter":
     """Get configured text splitter."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    
     return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
@@ -39,16 +84,20 @@ def get_text_splitter() -> RecursiveCharacterTextSplitter:
     )
 
 
-def get_embeddings() -> HuggingFaceEndpointEmbeddings:
+def get_embeddings() -> GuardedEmbeddings:
     """Get HuggingFace Inference API embeddings (cloud-based, no local download)."""
-    global _embeddings_model
+    global _embeddings_model, _guarded_embeddings
     if _embeddings_model is None:
+        from langchain_huggingface import HuggingFaceEndpointEmbeddings
+        
         print(f"🔄 Initializing HF Embeddings with model: {EMBEDDING_MODEL}")
         _embeddings_model = HuggingFaceEndpointEmbeddings(
             model=EMBEDDING_MODEL,
             huggingfacehub_api_token=HF_TOKEN
         )
-    return _embeddings_model
+    if _guarded_embeddings is None or _guarded_embeddings.client is not _embeddings_model:
+        _guarded_embeddings = GuardedEmbeddings(_embeddings_model)
+    return _guarded_embeddings
 
 
 def extract_text_from_pdf(file_path: str) -> List[Tuple[str, int]]:
@@ -61,6 +110,8 @@ def extract_text_from_pdf(file_path: str) -> List[Tuple[str, int]]:
     Returns:
         List of (text, page_number) tuples
     """
+    from pypdf import PdfReader
+    
     reader = PdfReader(file_path)
     pages = []
     
@@ -72,13 +123,80 @@ def extract_text_from_pdf(file_path: str) -> List[Tuple[str, int]]:
     return pages
 
 
-def process_document(file_path: str, filename: str) -> Tuple[str, List[Document]]:
+def sidecar_path_for(file_path: str) -> Path:
+    """Extracted-text sidecar location for a PDF (next to it)."""
+    return Path(f"{file_path}{SIDECAR_SUFFIX}")
+
+
+def save_sidecar(path: Path, doc_id: str, filename: str, pages: List[Tuple[str, int]]) -> None:
+    """Write a PDF's extracted pages (atomically)."""
+    payload = {
+        "version": SIDECAR_VERSION,
+        "doc_id": doc_id,
+        "filename": filename,
+        "pages": [[page_number, text] for text, page_number in pages]
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), compresslevel=6))
+    os.replace(tmp, path)
+
+
+def load_sidecar(path: Path) -> Tuple[str, str, List[Tuple[str, int]]]:
+    """
+    Read a sidecar.
+    
+    Returns:
+        Tuple of (doc_id, filename, list of (text, page_number))
+    """
+    with open(path, "rb") as f:
+        payload = json.loads(gzip.decompress(f.read()))
+    return payload["doc_id"], payload["filename"], [(text, page) for page, text in payload["pages"]]
+
+
+def chunk_extracted_pages(pages: List[Tuple[str, int]]) -> Iterator[Tuple[str, int]]:
+    """Yield (chunk text, page number) with the configured chunker, one chunk at a time."""
+    if CHUNKER == "recursive":
+        splitter = get_text_splitter()
+        for page_text, page_number in pages:
+            for chunk in splitter.split_text(page_text):
+                yield chunk, page_number
+        return
+    # Offsets in one pass; each chunk's text is sliced when the caller reaches it
+    for view in chunk_pages(pages):
+        yield view.text, view.page
+
+
+def build_documents(doc_id: str, filename: str, chunks: Iterable[Tuple[str, int]]) -> List[Document]:
+    """Wrap chunks as Documents with the standard metadata."""
+    return [
+        Document(
+            page_content=chunk,
+            metadata={
+                "doc_id": doc_id,
+                "filename": filename,
+                "page": page_number,
+                "chunk_index": chunk_index,
+                "source": filename
+            }
+        )
+        for chunk_index, (chunk, page_number) in enumerate(chunks)
+    ]
+
+
+def process_document(
+    file_path: str,
+    filename: str,
+    sidecar_path: Optional[str] = None
+) -> Tuple[str, List[Document]]:
     """
     Process a PDF document into chunks with metadata.
     
     Args:
         file_path: Path to uploaded PDF
         filename: Original filename
+        sidecar_path: Where to save the extracted text (default: next to the PDF)
         
     Returns:
         Tuple of (doc_id, list of Document chunks)
@@ -100,27 +218,16 @@ def process_document(file_path: str, filename: str) -> Tuple[str, List[Document]
         if not pages:
             raise ValueError("No text could be extracted from PDF")
         
-        # Chunk the text
-        splitter = get_text_splitter()
-        documents = []
-        chunk_index = 0
+        # Keep the extracted text for re-indexing without re-parsing
+        try:
+            save_sidecar(Path(sidecar_path) if sidecar_path else sidecar_path_for(file_path), doc_id, filename, pages)
+        except OSError as e:
+            print(f"Warning: Could not save text sidecar for {filename}: {e}")
         
-        for page_text, page_number in pages:
-            chunks = splitter.split_text(page_text)
-            
-            for chunk in chunks:
-                doc = Document(
-                    page_content=chunk,
-                    metadata={
-                        "doc_id": doc_id,
-                        "filename": filename,
-                        "page": page_number,
-                        "chunk_index": chunk_index,
-                        "source": filename
-                    }
-                )
-                documents.append(doc)
-                chunk_index += 1
+        # Chunk the text. Every chunk becomes a Document here: embedding, the
+        # chunk store and BM25 all take the whole list, so lazy views save
+        # memory only for callers that consume chunks one at a time
+        documents = build_documents(doc_id, filename, chunk_extracted_pages(pages))
         
         # Update status to ready
         _document_status[doc_id]["status"] = "ready"
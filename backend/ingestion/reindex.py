@@ -0,0 +1,321 @@
+"""
+Rebuild the chunk store and indexes from extracted-text sidecars.
+
+After changing CHUNK_SIZE, CHUNK_OVERLAP, CHUNKER or EMBEDDING_MODEL, run
+this instead of re-uploading: every sidecar under UPLOAD_DIR is re-chunked
+in worker processes (no PDF parsing), and only chunk texts that the current
+index doesn't already hold a vector for (same text, same model) are sent
+to the embeddings API. Document IDs are kept.
+
+The new store is built beside the old one and swapped in at the end. Run
+it while the API server is stopped (or restart the server afterwards); BM25
+is rebuilt from the new chunk store when the server loads it.
+
+Usage (from backend/):
+    python -m ingestion.reindex --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import (
+    UPLOAD_DIR,
+    VECTOR_STORE_DIR,
+    EMBEDDING_MODEL,
+    SIDECAR_SUFFIX,
+    BULK_EMBED_WORKERS,
+    BULK_MANIFEST_FILE,
+    REINDEX_EMBED_BATCH
+)
+from ingestion.document_processor import (
+    build_documents,
+    chunk_extracted_pages,
+    extract_text_from_pdf,
+    get_embeddings,
+    load_sidecar,
+    save_sidecar,
+    sidecar_path_for
+)
+from retrievers.chunk_store import ChunkStore
+from retrievers.vector_store import SegmentedIndex, has_persisted_index, read_index, read_index_meta, write_index
+
+
+def find_sidecars(directory: str = UPLOAD_DIR) -> List[Path]:
+    """List sidecars under a directory (recursive, sorted for stable chunk IDs)."""
+    return sorted(Path(directory).rglob(f"*{SIDECAR_SUFFIX}"))
+
+
+def _upload_filename(path: Path) -> str:
+    """Original filename of an upload saved as "<uuid>_<filename>"."""
+    prefix, _, rest = path.name.partition("_")
+    return rest if len(prefix) == 36 and rest else path.name
+
+
+def _extract_sidecar(pdf_path: str, sidecar_path: str, doc_id: str, filename: str) -> None:
+    """Worker: parse one PDF and save its sidecar."""
+    pages = extract_text_from_pdf(pdf_path)
+    if not pages:
+        raise ValueError("No text could be extracted from PDF")
+    save_sidecar(Path(sidecar_path), doc_id, filename, pages)
+
+
+def backfill_sidecars(
+    store_dir: Path,
+    directory: str = UPLOAD_DIR,
+    workers: Optional[int] = None
+) -> int:
+    """
+    Parse PDFs uploaded before sidecars existed (once).
+    
+    A PDF keeps the doc ID of the indexed document with the same filename
+    when exactly one has it; otherwise it gets a new one.
+    """
+    pdfs = [
+        path for path in sorted(Path(directory).rglob("*"))
+        if path.suffix.lower() == ".pdf" and not sidecar_path_for(str(path)).exists()
+    ]
+    if not pdfs:
+        return 0
+    
+    by_filename: Dict[str, List[str]] = {}
+    store = ChunkStore(str(store_dir))
+    if store.exists():
+        store.load()
+        for doc_id, filename in store.documents():
+            by_filename.setdefault(filename, []).append(doc_id)
+    
+    print(f"📄 Extracting text from {len(pdfs)} PDFs without a sidecar")
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as parsers:
+        futures = {}
+        for path in pdfs:
+            filename = _upload_filename(path)
+            known = by_filename.get(filename, [])
+            doc_id = known[0] if len(known) == 1 else str(uuid.uuid4())
+            futures[parsers.submit(_extract_sidecar, str(path), str(sidecar_path_for(str(path))), doc_id, filename)] = path
+        for future, path in futures.items():
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                print(f"❌ {path}: {e}")
+    return done
+
+
+def _chunk_sidecar(path: str) -> Tuple[str, str, List[Tuple[str, int]]]:
+    """Worker: read one sidecar and chunk it with the current settings."""
+    doc_id, filename, pages = load_sidecar(Path(path))
+    return doc_id, filename, list(chunk_extracted_pages(pages))
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.sha1(f"{EMBEDDING_MODEL}\0{text}".encode("utf-8")).digest()
+
+
+def load_reusable_vectors(store_dir: Path):
+    """
+    Vectors of the current index by (model, chunk text).
+    
+    Returns:
+        (matrix, {text key: row}); empty if the index was built with another
+        model or predates index metadata
+    """
+    import faiss
+    import numpy as np
+
+    meta = read_index_meta(store_dir)
+    if not has_persisted_index(store_dir) or not ChunkStore(str(store_dir)).exists():
+        return None, {}
+    if meta is None or meta.get("embedding_model") != EMBEDDING_MODEL:
+        print("ℹ️  Existing vectors were made by another (or an unrecorded) model: embedding everything")
+        return None, {}
+    
+    segments = [segment for segment in read_index(store_dir).segments if segment.ntotal]
+    if not segments:
+        return None, {}
+    store = ChunkStore(str(store_dir)).load()
+    matrix = np.concatenate([
+        faiss.downcast_index(segment.index).reconstruct_n(0, segment.ntotal) for segment in segments
+    ])
+    chunk_ids = np.concatenate([faiss.vector_to_array(segment.id_map) for segment in segments])
+    rows = {
+        _text_key(store.get_text(int(chunk_id))): row
+        for row, chunk_id in enumerate(chunk_ids)
+        if chunk_id < len(store)
+    }
+    return matrix, rows
+
+
+def _covered_doc_ids(store_dir: Path) -> Set[str]:
+    """Doc IDs in the current chunk store."""
+    store = ChunkStore(str(store_dir))
+    return {doc_id for doc_id, _ in store.load().documents()} if store.exists() else set()
+
+
+# Files of the old store directory that the re-index doesn't rebuild and keeps
+CARRIED_OVER_FILES = (BULK_MANIFEST_FILE,)
+
+
+def _swap_in(new_dir: Path, store_dir: Path) -> None:
+    """Replace the store directory, keeping only CARRIED_OVER_FILES from the old one."""
+    for name in CARRIED_OVER_FILES:
+        if (store_dir / name).is_file():
+            shutil.copy2(store_dir / name, new_dir / name)
+    old_dir = store_dir.with_name(store_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if store_dir.exists():
+        os.replace(store_dir, old_dir)
+    os.replace(new_dir, store_dir)
+    # Everything else of the old store (legacy index.pkl included) goes with it
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def reindex(
+    workers: Optional[int] = None,
+    embed_workers: int = BULK_EMBED_WORKERS,
+    batch_size: int = REINDEX_EMBED_BATCH,
+    backfill: bool = False,
+    force: bool = False
+) -> Dict:
+    """
+    Rebuild the chunk store and FAISS index from the sidecars in UPLOAD_DIR.
+    
+    Args:
+        workers: Chunking processes (default: CPU count)
+        embed_workers: Concurrent embedding requests
+        batch_size: Texts per embedding request
+        backfill: First extract sidecars for PDFs that have none (parses only those PDFs)
+        force: Rebuild even if some indexed documents have no sidecar (they are dropped)
+        
+    Returns:
+        Run statistics
+    """
+    import faiss
+    import numpy as np
+    
+    start = time.perf_counter()
+    store_dir = Path(VECTOR_STORE_DIR)
+    stats = {
+        "backfilled": backfill_sidecars(store_dir, workers=workers) if backfill else 0,
+        "documents": 0,
+        "chunks": 0,
+        "vectors_reused": 0,
+        "texts_embedded": 0,
+        "duplicate_texts": 0,
+        "elapsed_s": 0.0
+    }
+    
+    sidecars = find_sidecars()
+    if not sidecars:
+        print(f"No sidecars found in {UPLOAD_DIR} (use --backfill to extract them from the PDFs)")
+        return stats
+    
+    # Chunk in parallel; results come back in sidecar order so chunk IDs are stable
+    with ProcessPoolExecutor(max_workers=workers) as chunkers:
+        chunked = list(chunkers.map(_chunk_sidecar, map(str, sidecars), chunksize=8))
+    
+    missing = _covered_doc_ids(store_dir) - {doc_id for doc_id, _, _ in chunked}
+    if missing and not force:
+        raise SystemExit(
+            f"{len(missing)} indexed documents have no sidecar and would be dropped. "
+            "Run with --backfill to extract their text from the PDFs, or --force to drop them."
+        )
+    
+    reuse_matrix, reuse_rows = load_reusable_vectors(store_dir)
+    
+    new_dir = store_dir.with_name(store_dir.name + ".reindex")
+    shutil.rmtree(new_dir, ignore_errors=True)
+    store = ChunkStore(str(new_dir))
+    
+    reused_ids: List[int] = []
+    reused_rows: List[int] = []
+    # Texts to embed, deduplicated: text key -> (text, chunk IDs)
+    pending: Dict[bytes, Tuple[str, List[int]]] = {}
+    
+    documents = [
+        doc
+        for doc_id, filename, chunks in chunked
+        for doc in build_documents(doc_id, filename, chunks)
+    ]
+    for chunk_id, doc in zip(store.add(documents), documents):
+        key = _text_key(doc.page_content)
+        row = reuse_rows.get(key)
+        if row is not None:
+            reused_ids.append(chunk_id)
+            reused_rows.append(row)
+        elif key in pending:
+            pending[key][1].append(chunk_id)
+            stats["duplicate_texts"] += 1
+        else:
+            pending[key] = (doc.page_content, [chunk_id])
+    stats["documents"] = len(chunked)
+    stats["chunks"] = len(documents)
+    
+    # Embed only what's new, several requests at a time
+    embeddings = get_embeddings()
+    items = list(pending.values())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    with ThreadPoolExecutor(max_workers=embed_workers) as embedders:
+        futures: List[Future] = [
+            embedders.submit(embeddings.embed_documents, [text for text, _ in batch])
+            for batch in batches
+        ]
+        embedded = [future.result() for future in futures]
+    
+    index = None
+    if reused_ids:
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(reuse_matrix.shape[1]))
+        index.add_with_ids(reuse_matrix[reused_rows], np.asarray(reused_ids, dtype="int64"))
+    for batch, vectors in zip(batches, embedded):
+        ids = [chunk_id for _, chunk_ids in batch for chunk_id in chunk_ids]
+        matrix = np.asarray([vector for (_, chunk_ids), vector in zip(batch, vectors) for _ in chunk_ids], dtype="float32")
+        if index is None:
+            index = faiss.IndexIDMap(faiss.IndexFlatL2(matrix.shape[1]))
+        index.add_with_ids(matrix, np.asarray(ids, dtype="int64"))
+    
+    store.save()
+    if index is not None:
+        write_index(new_dir, SegmentedIndex([index]))
+    _swap_in(new_dir, store_dir)
+    
+    stats["vectors_reused"] = len(reused_ids)
+    stats["texts_embedded"] = len(items)
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    print(
+        f"✅ Re-indexed {stats['documents']} documents, {stats['chunks']} chunks "
+        f"({stats['vectors_reused']} vectors reused, {stats['texts_embedded']} texts embedded)"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the chunk store and indexes from extracted-text sidecars")
+    parser.add_argument("--workers", type=int, default=None, help="Chunking processes (default: CPU count)")
+    parser.add_argument("--embed-workers", type=int, default=BULK_EMBED_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=REINDEX_EMBED_BATCH, help="Texts per embedding request")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Extract sidecars for PDFs in the upload directory that have none")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild even if indexed documents without a sidecar would be dropped")
+    args = parser.parse_args()
+    
+    stats = reindex(
+        workers=args.workers,
+        embed_workers=args.embed_workers,
+        batch_size=args.batch_size,
+        backfill=args.backfill,
+        force=args.force
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,32 +4,61 @@ Agentic RAG Platform with Hybrid Search
 """
 
 import os
+import json
+import time
 import uuid
 import shutil
+import asyncio
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+_process_start = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 
-from config import HOST, PORT, CORS_ORIGINS, UPLOAD_DIR
+from config import (
+    HOST,
+    PORT,
+    CORS_ORIGINS,
+    UPLOAD_DIR,
+    WARMUP_ON_STARTUP,
+    BATCH_MAX_QUERIES,
+    CHAT_DEADLINE_S,
+    CHAT_MAX_DEADLINE_S,
+    ADMIN_TOKEN,
+    PROFILER_CONTINUOUS_HZ
+)
 from schemas.models import (
     ChatRequest,
     ChatResponse,
+    BatchChatRequest,
+    BatchChatResult,
     DocumentStatus,
     DocumentListResponse,
     UploadResponse
 )
-from agents.rag_agent import run_agent
+from agents.rag_agent import run_agent, run_batch_agent, retrieve_batch
+from agents.prompt_cache import get_prompt_cache_metrics
 from ingestion.document_processor import (
     process_document,
     get_document_status,
     get_all_documents,
     ensure_upload_dir
 )
-from retrievers.vector_store import add_documents, initialize_vector_store
-from retrievers.hybrid_retriever import update_bm25_corpus
+from memory.session_memory import get_memory_metrics
+from retrievers.vector_store import add_documents, get_vector_store
+from retrievers.embedding_batcher import get_query_batcher
+from retrievers.index_snapshot import get_snapshot_metrics
+from retrievers.retrieval_cache import get_retrieval_cache
+from outbound.provider import get_outbound_metrics
+from profiling.sampler import ProfilingMiddleware, get_sampler, install, is_admin
+from retrievers.hybrid_retriever import (
+    update_bm25_corpus,
+    load_persisted_indexes,
+    search_documents
+)
 
 
 # Initialize FastAPI app
@@ -48,13 +77,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sampling profiler hooks (?profile=1, continuous sampling by endpoint)
+app.add_middleware(ProfilingMiddleware)
+
+
+# Readiness state and startup profile (reported by /ready)
+_startup_state = {
+    "ready": False,
+    "warmup": "disabled",
+    "error": None,
+    "profile": {}
+}
+
+
+def warm_up() -> None:
+    """
+    Pay the first-request costs before reporting ready.
+    
+    Loads persisted indexes, creates the embedding and chat clients and
+    runs one dummy retrieval. Each phase is timed into the startup profile.
+    """
+    from agents.rag_agent import get_llm_with_tools
+    from ingestion.document_processor import get_embeddings
+    
+    profile = _startup_state["profile"]
+    
+    start = time.perf_counter()
+    # FAISS from disk; BM25 is in-memory only and rebuilt from the chunk store
+    load_persisted_indexes()
+    store = get_vector_store()
+    profile["load_indexes_s"] = round(time.perf_counter() - start, 3)
+    
+    start = time.perf_counter()
+    get_embeddings()
+    get_llm_with_tools()
+    profile["create_clients_s"] = round(time.perf_counter() - start, 3)
+    
+    start = time.perf_counter()
+    if store is not None:
+        search_documents("warm-up query", k=1)
+    profile["dummy_query_s"] = round(time.perf_counter() - start, 3)
+
+
+async def run_warm_up() -> None:
+    """Run warm-up off the event loop so liveness keeps answering."""
+    try:
+        await asyncio.to_thread(warm_up)
+        _startup_state["warmup"] = "complete"
+    except Exception as e:
+        # A failed warm-up degrades to lazy initialization; still serve traffic
+        _startup_state["warmup"] = "failed"
+        _startup_state["error"] = str(e)
+        print(f"Warning: Warm-up failed: {e}")
+    _startup_state["ready"] = True
+    _startup_state["profile"]["ready_after_s"] = round(time.perf_counter() - _process_start, 3)
+    print(f"✅ Ready after {_startup_state['profile']['ready_after_s']}s")
+
 
 @app.on_event("startup")
 async def startup():
     """Initialize services on startup."""
     ensure_upload_dir()
-    # Vector store initializes lazily when first document is uploaded
-    print("✨ FinSync Pro initialized")
+    install(asyncio.get_running_loop())
+    if PROFILER_CONTINUOUS_HZ > 0:
+        if ADMIN_TOKEN:
+            get_sampler().start_continuous(PROFILER_CONTINUOUS_HZ)
+        else:
+            # Nobody could read the stacks: don't pay for sampling
+            print("Warning: PROFILER_CONTINUOUS_HZ is set but ADMIN_TOKEN is not; profiling is disabled")
+    _startup_state["profile"]["startup_s"] = round(time.perf_counter() - _process_start, 3)
+    
+    if WARMUP_ON_STARTUP:
+        _startup_state["warmup"] = "running"
+        asyncio.get_running_loop().create_task(run_warm_up())
+    else:
+        # Vector store initializes lazily when first document is uploaded
+        _startup_state["ready"] = True
+    print(f"✨ FinSync Pro initialized in {_startup_state['profile']['startup_s']}s")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -74,24 +173,69 @@ async def chat(request: ChatRequest):
     try:
         result = await run_agent(
             query=request.query,
-            session_id=request.session_id or str(uuid.uuid4())
+            session_id=request.session_id or str(uuid.uuid4()),
+            timeout_s=min(request.timeout_s or CHAT_DEADLINE_S, CHAT_MAX_DEADLINE_S)
         )
         
         return ChatResponse(
             answer=result["answer"],
             trace=result["trace"],
             citations=result["citations"],
-            session_id=result["session_id"]
+            session_id=result["session_id"],
+            stop_reason=result["stop_reason"],
+            usage=result["usage"]
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Bulk question answering over the uploaded documents.
+    
+    Retrieval for all questions runs in one pass; answers are generated
+    concurrently under BATCH_LLM_CONCURRENCY.
+    Results stream back as NDJSON (one BatchChatResult per line) in
+    completion order; use `index` to match them to the request. A failure
+    after streaming has started ends the stream with an {"error": ...} line.
+    """
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_MAX_QUERIES} queries per batch"
+        )
+    
+    # Retrieve before the 200 goes out, so a failure is still a proper error response
+    try:
+        all_docs = await retrieve_batch(request.queries, k=request.k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retrieval failed: {e}")
+    
+    async def stream():
+        try:
+            async for result in run_batch_agent(request.queries, k=request.k, all_docs=all_docs):
+                yield BatchChatResult(**result).model_dump_json() + "\n"
+        except Exception as e:
+            # Headers are already sent: report the failure in-band
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # DOCUMENT UPLOAD ENDPOINTS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def index_document(file_path: str, filename: str):
+    """Chunk a saved PDF and add it to FAISS and BM25 (blocking)."""
+    doc_id, documents = process_document(file_path, filename)
+    add_documents(documents)
+    update_bm25_corpus(documents)
+    return doc_id, documents
+
+
 @app.post("/api/upload", response_model=UploadResponse)
 async def upload_document(file: UploadFile = File(...)):
     """
@@ -101,6 +245,9 @@ async def upload_document(file: UploadFile = File(...)):
     1. Saved to uploads directory
     2. Chunked with metadata
     3. Indexed in FAISS (semantic) and BM25 (keyword)
+    
+    Parsing and indexing run in a worker thread; searches keep serving the
+    previous index snapshot until the new one is published.
     """
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
@@ -117,12 +264,8 @@ async def upload_document(file: UploadFile = File(...)):
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
         
-        # Process document
-        doc_id, documents = process_document(str(file_path), file.filename)
-        
-        # Add to vector stores
-        add_documents(documents)
-        update_bm25_corpus(documents)
+        # Process document and add to vector stores
+        doc_id, documents = await asyncio.to_thread(index_document, str(file_path), file.filename)
         
         return UploadResponse(
             doc_id=doc_id,
@@ -176,10 +319,96 @@ async def get_status(doc_id: str):
 @app.get("/health")
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is up and serving requests."""
     return {"status": "healthy", "service": "FinSync Pro"}
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Runtime metrics (memory prompt-token savings, prompt caching, query embedding batches, provider calls, index snapshots, retrieval cache)."""
+    return {
+        "indexes": get_snapshot_metrics(),
+        "retrieval_cache": get_retrieval_cache().get_metrics(),
+        "memory": get_memory_metrics(),
+        "prompt_cache": get_prompt_cache_metrics(),
+        "embedding_batcher": get_query_batcher().get_metrics(),
+        "outbound": get_outbound_metrics()
+    }
+
+
+@app.get("/ready")
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness check: 503 until the optional warm-up has finished."""
+    body = {
+        "status": "ready" if _startup_state["ready"] else "starting",
+        "warmup": _startup_state["warmup"],
+        "error": _startup_state["error"],
+        "profile": _startup_state["profile"]
+    }
+    return JSONResponse(body, status_code=200 if _startup_state["ready"] else 503)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ADMIN: PROFILER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def require_admin(request: Request) -> None:
+    """403 unless the caller presents ADMIN_TOKEN (always, while none is set)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+
+@app.get("/api/admin/profiler")
+async def profiler_status(request: Request):
+    """Continuous sampling state and the per-request profiles kept."""
+    require_admin(request)
+    return get_sampler().status()
+
+
+@app.post("/api/admin/profiler/start")
+async def profiler_start(request: Request, hz: float = 10.0, reset: bool = False):
+    """Start (or retune) continuous sampling of all traffic."""
+    require_admin(request)
+    if not 0 < hz <= 1000:
+        raise HTTPException(status_code=400, detail="hz must be in (0, 1000]")
+    get_sampler().start_continuous(hz, reset=reset)
+    return get_sampler().status()
+
+
+@app.post("/api/admin/profiler/stop")
+async def profiler_stop(request: Request):
+    """Stop continuous sampling (collected stacks are kept)."""
+    require_admin(request)
+    get_sampler().stop_continuous()
+    return get_sampler().status()
+
+
+@app.get("/api/admin/profiler/stacks", response_class=PlainTextResponse)
+async def profiler_stacks(request: Request, endpoint: Optional[str] = None):
+    """
+    Continuous samples as collapsed stacks (flamegraph.pl / speedscope).
+    
+    Stacks are rooted at their endpoint ("POST /api/chat;..."); pass
+    endpoint to get a single endpoint's stacks without that root.
+    """
+    require_admin(request)
+    return get_sampler().continuous_collapsed(endpoint)
+
+
+@app.get("/api/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def request_profile(request: Request, profile_id: str):
+    """Collapsed stacks of one ?profile=1 request (ID from its X-Profile-Id header)."""
+    require_admin(request)
+    profile = get_sampler().get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    lines = profile.collapsed()
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MAIN
 # ═══════════════════════════════════════════════════════════════════════════════
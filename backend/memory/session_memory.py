@@ -1,18 +1,84 @@
 """
 Session-based Conversational Memory Manager.
-Uses ConversationBufferWindowMemory with configurable window size.
+Uses ConversationBufferWindowMemory with configurable window size, or a
+rolling summary plus the last few turns (MEMORY_MODE = "summary").
+Summaries are updated in background tasks, never on the request path.
 """
 
-from typing import Dict
-from langchain_classic.memory import ConversationBufferWindowMemory
-from config import MEMORY_WINDOW_K
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from config import (
+    MEMORY_WINDOW_K,
+    MEMORY_MODE,
+    SUMMARY_RECENT_TURNS,
+    SUMMARY_FOLD_TURNS,
+    MEMORY_MAX_HISTORY_TOKENS
+)
+from outbound.deadline import set_deadline
+from agents.prompt_cache import forget_session
+
+if TYPE_CHECKING:
+    from langchain_classic.memory import ConversationBufferWindowMemory
+
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and FinSync Pro, a financial assistant.
+Keep every fact, number, date, document name and user preference that could matter later. Drop pleasantries.
+Reply with the updated summary only, at most 150 words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}"""
 
 
 # Server-side session storage
-_sessions: Dict[str, ConversationBufferWindowMemory] = {}
+_sessions: Dict[str, "ConversationBufferWindowMemory"] = {}
+_summary_sessions: Dict[str, "SummaryMemory"] = {}
+
+# Keep references to in-flight summary tasks so they aren't garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+# Prompt-size metrics (approximate tokens)
+_metrics = {
+    "requests": 0,
+    "history_tokens_sent": 0,
+    "history_tokens_full": 0,
+    "summary_updates": 0,
+    "summary_failures": 0,
+    "summary_seconds": 0.0,
+    # Turns not yet in the summary that the token cap left out of a prompt
+    "pending_turns_dropped": 0
+}
 
 
-def get_or_create_memory(session_id: str) -> ConversationBufferWindowMemory:
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class SummaryMemory:
+    """Rolling summary of older turns plus the most recent turns verbatim."""
+    
+    def __init__(self):
+        self.summary = ""
+        self.recent: List[Tuple[str, str]] = []
+        # Turns evicted from `recent` but not yet folded into the summary
+        self.pending: List[Tuple[str, str]] = []
+        # Tokens the full verbatim history would cost
+        self.full_history_tokens = 0
+        self.task: Optional[asyncio.Task] = None
+    
+    def add_turn(self, query: str, answer: str) -> None:
+        """Record a turn; overflow moves to pending for the next summary update."""
+        self.recent.append((query, answer))
+        self.full_history_tokens += estimate_tokens(query) + estimate_tokens(answer)
+        while len(self.recent) > SUMMARY_RECENT_TURNS:
+            self.pending.append(self.recent.pop(0))
+
+
+def get_or_create_memory(session_id: str) -> "ConversationBufferWindowMemory":
     """
     Get existing memory for session or create new one.
     
@@ -23,6 +89,8 @@ def get_or_create_memory(session_id: str) -> ConversationBufferWindowMemory:
         ConversationBufferWindowMemory instance for the session
     """
     if session_id not in _sessions:
+        from langchain_classic.memory import ConversationBufferWindowMemory
+        
         _sessions[session_id] = ConversationBufferWindowMemory(
             k=MEMORY_WINDOW_K,
             memory_key="chat_history",
@@ -32,6 +100,179 @@ def get_or_create_memory(session_id: str) -> ConversationBufferWindowMemory:
     return _sessions[session_id]
 
 
+def get_or_create_summary_memory(session_id: str) -> SummaryMemory:
+    """Get existing summary memory for session or create new one."""
+    if session_id not in _summary_sessions:
+        _summary_sessions[session_id] = SummaryMemory()
+    return _summary_sessions[session_id]
+
+
+def _cap_history(
+    summary: str,
+    turns: List[Tuple[str, str]],
+    max_tokens: int
+) -> Tuple[List[Dict[str, str]], int, int]:
+    """
+    Build history messages under the token cap.
+    
+    The summary comes first (truncated if it alone exceeds the cap), then as
+    many of the newest turns as still fit, oldest first.
+    
+    Returns:
+        (messages, tokens used, number of turns kept)
+    """
+    messages: List[Dict[str, str]] = []
+    used = 0
+    
+    if summary:
+        summary = summary[:max_tokens * 4]
+        used = estimate_tokens(summary)
+        messages.append({"role": "system", "content": f"Conversation summary so far:\n{summary}"})
+    
+    kept: List[Dict[str, str]] = []
+    kept_turns = 0
+    for query, answer in reversed(turns):
+        cost = estimate_tokens(query) + estimate_tokens(answer)
+        if used + cost > max_tokens:
+            break
+        used += cost
+        kept[:0] = [
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": answer}
+        ]
+        kept_turns += 1
+    
+    return messages + kept, used, kept_turns
+
+
+def get_history_messages(session_id: str) -> List[Dict[str, str]]:
+    """
+    Get chat history to replay for a session, as role/content dicts.
+    
+    Args:
+        session_id: Unique session identifier
+        
+    Returns:
+        History messages (in summary mode, capped at MEMORY_MAX_HISTORY_TOKENS)
+    """
+    if MEMORY_MODE == "summary":
+        memory = get_or_create_summary_memory(session_id)
+        # Pending turns stay verbatim until the background summary absorbs them
+        turns = memory.pending + memory.recent
+        messages, used, kept = _cap_history(memory.summary, turns, MEMORY_MAX_HISTORY_TOKENS)
+        # The cap drops the oldest turns first, and pending turns are the oldest
+        dropped = min(len(turns) - kept, len(memory.pending))
+        if dropped:
+            # In neither the summary nor the prompt: fold them now rather
+            # than waiting for SUMMARY_FOLD_TURNS
+            _metrics["pending_turns_dropped"] += dropped
+            print(
+                f"Warning: {dropped} unsummarized turns of session {session_id} "
+                f"left out of the prompt by MEMORY_MAX_HISTORY_TOKENS"
+            )
+            _schedule_fold(memory)
+        full = memory.full_history_tokens
+    else:
+        chat_history = get_or_create_memory(session_id).load_memory_variables({}).get("chat_history", [])
+        turns = [
+            (chat_history[i].content, chat_history[i + 1].content)
+            for i in range(0, len(chat_history) - 1, 2)
+        ]
+        # The window (MEMORY_WINDOW_K turns) is the only limit here
+        messages = [
+            {"role": role, "content": content}
+            for query, answer in turns
+            for role, content in (("user", query), ("assistant", answer))
+        ]
+        full = used = sum(estimate_tokens(q) + estimate_tokens(a) for q, a in turns)
+    
+    _metrics["requests"] += 1
+    _metrics["history_tokens_sent"] += used
+    _metrics["history_tokens_full"] += full
+    return messages
+
+
+async def _summarize(summary: str, turns: List[Tuple[str, str]]) -> str:
+    """Fold turns into the summary with one LLM call."""
+    from agents.rag_agent import get_llm, invoke_llm
+    
+    rendered = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in turns)
+    response = await invoke_llm(get_llm(), [
+        {"role": "user", "content": SUMMARY_PROMPT.format(summary=summary or "(empty)", turns=rendered)}
+    ], kind="summary")
+    return str(response.content).strip()
+
+
+async def _update_summary(memory: SummaryMemory) -> None:
+    """Drain pending turns into the summary; runs after the response is sent."""
+    # The task copies the chat request's context, but the fold isn't part of
+    # that request and mustn't inherit its (nearly spent) deadline
+    set_deadline(None)
+    while memory.pending:
+        batch = list(memory.pending)
+        start = time.perf_counter()
+        try:
+            memory.summary = await _summarize(memory.summary, batch)
+        except Exception as e:
+            # Keep the turns pending (still replayed verbatim) and retry next turn
+            _metrics["summary_failures"] += 1
+            print(f"Warning: Summary update failed: {e}")
+            return
+        del memory.pending[:len(batch)]
+        _metrics["summary_updates"] += 1
+        _metrics["summary_seconds"] += time.perf_counter() - start
+
+
+def record_turn(session_id: str, query: str, answer: str) -> None:
+    """
+    Save a completed turn to the session's memory.
+    
+    In summary mode this only appends; any summary update is scheduled as a
+    background task so the caller never waits for it. Evicted turns are
+    folded SUMMARY_FOLD_TURNS at a time: until then the replayed history
+    only grows, so the previous request's prompt stays a cacheable prefix.
+    
+    Args:
+        session_id: Unique session identifier
+        query: User's question
+        answer: Final answer
+    """
+    if MEMORY_MODE != "summary":
+        get_or_create_memory(session_id).save_context({"input": query}, {"output": answer})
+        return
+    
+    memory = get_or_create_summary_memory(session_id)
+    memory.add_turn(query, answer)
+    
+    if len(memory.pending) >= SUMMARY_FOLD_TURNS:
+        _schedule_fold(memory)
+
+
+def _schedule_fold(memory: SummaryMemory) -> None:
+    """Start a background summary update unless one is already running."""
+    if memory.task is not None and not memory.task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # No loop (sync caller): the next async turn picks it up
+    memory.task = loop.create_task(_update_summary(memory))
+    _background_tasks.add(memory.task)
+    memory.task.add_done_callback(_background_tasks.discard)
+
+
+def get_memory_metrics() -> Dict:
+    """Get memory mode and prompt-token savings."""
+    sent, full = _metrics["history_tokens_sent"], _metrics["history_tokens_full"]
+    return {
+        "mode": MEMORY_MODE,
+        **_metrics,
+        "summary_seconds": round(_metrics["summary_seconds"], 3),
+        "history_tokens_saved": full - sent,
+        "savings_ratio": round(1 - sent / full, 3) if full else 0.0
+    }
+
+
 def clear_session(session_id: str) -> bool:
     """
     Clear memory for a specific session.
@@ -42,12 +283,17 @@ def clear_session(session_id: str) -> bool:
     Returns:
         True if session existed and was cleared
     """
+    forget_session(session_id)
+    existed = False
     if session_id in _sessions:
         del _sessions[session_id]
-        return True
-    return False
+        existed = True
+    if session_id in _summary_sessions:
+        del _summary_sessions[session_id]
+        existed = True
+    return existed
 
 
 def get_active_sessions_count() -> int:
     """Get count of active sessions."""
-    return len(_sessions)
+    return len(_sessions) + len(_summary_sessions)
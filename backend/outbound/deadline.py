@@ -0,0 +1,73 @@
+"""
+Request deadlines.
+A chat request sets its deadline once; the outbound layer reads it from a
+context variable, so retries, backoff and hedges never run past it.
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar, Token
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out (never retried)."""
+
+
+class Deadline:
+    """Absolute point in time by which a request must finish."""
+    
+    def __init__(self, timeout_s: float):
+        self.timeout_s = timeout_s
+        self.expires_at = time.monotonic() + timeout_s
+    
+    def remaining(self) -> float:
+        """Seconds left (0 once expired)."""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+    
+    def elapsed(self) -> float:
+        """Seconds since the deadline was set."""
+        return self.timeout_s - (self.expires_at - time.monotonic())
+
+
+# Deadline of the request being served (copied into tasks and worker threads)
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def set_deadline(deadline: Optional[Deadline]) -> Token:
+    """Make a deadline current for this context; returns a token for reset_deadline."""
+    return _current_deadline.set(deadline)
+
+
+def reset_deadline(token: Token) -> None:
+    _current_deadline.reset(token)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left on the current deadline, or None if there is none."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+async def with_budget(awaitable: Awaitable[T], budget_s: float) -> T:
+    """
+    Await something for at most budget_s seconds.
+    
+    Unlike asyncio.wait_for, running out raises DeadlineExceeded, so it can't
+    be confused with a TimeoutError raised by the call itself.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=max(budget_s, 0.0))
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        raise DeadlineExceeded(f"Time budget of {budget_s:.2f}s exhausted")
+    return task.result()
@@ -0,0 +1,495 @@
+"""
+Outbound call layer for the LLM, web search and embedding providers.
+
+Every provider gets an adaptive concurrency limit (AIMD: grows while calls
+succeed quickly, shrinks on overload errors and slow responses) and
+retries with jittered exponential backoff. Idempotent calls of the kinds a
+provider hedges can also be hedged: if the first attempt is slower than the
+recent latency percentile of calls of the same kind, a second attempt races
+it and the first answer wins.
+Calls made under a request deadline (outbound.deadline) never start,
+retry or back off past it.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from config import (
+    OUTBOUND_MAX_RETRIES,
+    OUTBOUND_BACKOFF_BASE_S,
+    OUTBOUND_BACKOFF_MAX_S,
+    OUTBOUND_HEDGING,
+    OUTBOUND_HEDGE_PERCENTILE,
+    OUTBOUND_PROVIDERS
+)
+from outbound.deadline import DeadlineExceeded, deadline_remaining, with_budget
+
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Transport errors from openai/httpx/requests/aiohttp, matched by name so
+# none of those packages has to be imported here
+_TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout",
+    "ConnectionError", "ReadTimeout", "RemoteProtocolError", "ServerDisconnectedError",
+    "Timeout"
+}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by a provider error, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections."""
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in _TRANSIENT_ERRORS
+
+
+def _retry_after(error: Exception) -> float:
+    """Retry-After header (seconds) on a provider error, or 0."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+    
+    Usable from threads (acquire) and coroutines (aacquire). Freed slots are
+    handed straight to the oldest waiter, so waiters are served in order.
+    """
+    
+    def __init__(
+        self,
+        initial_limit: int,
+        max_limit: int,
+        latency_target_s: float,
+        min_limit: int = 1,
+        decrease_ratio: float = 0.5,
+        slow_ratio: float = 0.9
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_s = latency_target_s
+        self.decrease_ratio = decrease_ratio
+        self.slow_ratio = slow_ratio
+        self.in_flight = 0
+        # Smoothed round-trip time: at most one decrease per RTT
+        self.rtt_s = 0.0
+        self._lock = threading.Lock()
+        # (threading.Event, None, None) or (None, loop, asyncio.Future)
+        self._waiters: Deque[Tuple[Any, Any, Any]] = deque()
+        self._last_decrease = 0.0
+    
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    def _wake_waiters(self) -> None:
+        """Hand free slots to waiters (caller holds the lock)."""
+        while self._waiters and self._has_room():
+            event, loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            if event is not None:
+                event.set()
+            else:
+                loop.call_soon_threadsafe(self._resolve, future)
+    
+    def _resolve(self, future: asyncio.Future) -> None:
+        # The waiter was cancelled after its slot was handed over: give it back
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+    
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return True
+            return False
+    
+    def acquire(self) -> None:
+        """Wait for a slot (blocking)."""
+        event = threading.Event()
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return
+            self._waiters.append((event, None, None))
+        event.wait()
+    
+    async def aacquire(self) -> None:
+        """Wait for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (None, loop, future)
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            # Slot already ours; if _resolve hasn't run yet it releases it itself
+            if handed_over and future.done() and not future.cancelled():
+                self.release()
+            raise
+    
+    def release(self) -> None:
+        """Return a slot."""
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_waiters()
+    
+    def _decrease(self, ratio: float) -> None:
+        now = time.monotonic()
+        # One cut per round trip: a burst of failures from one overload counts once
+        if now - self._last_decrease < self.rtt_s:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * ratio)
+    
+    def on_success(self, latency_s: float, judge_latency: bool = True) -> None:
+        """
+        Grow by ~1 slot per limit's worth of fast calls; shrink a little if slow.
+        
+        judge_latency=False for calls whose latency grows with their input
+        (e.g. embedding a whole document): they count as successes only.
+        """
+        with self._lock:
+            if not judge_latency:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self._wake_waiters()
+                return
+            self.rtt_s = latency_s if not self.rtt_s else 0.9 * self.rtt_s + 0.1 * latency_s
+            if latency_s > self.latency_target_s:
+                self._decrease(self.slow_ratio)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self._wake_waiters()
+    
+    def on_overload(self) -> None:
+        """Halve the limit after a rate limit, server error or timeout."""
+        with self._lock:
+            self._decrease(self.decrease_ratio)
+
+
+class LatencyTracker:
+    """Recent call latencies (bounded window)."""
+    
+    def __init__(self, size: int = 256, min_samples: int = 20):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+    
+    def add(self, latency_s: float) -> None:
+        self._samples.append(latency_s)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until there are enough samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, -(-len(ordered) * pct // 100))
+        return ordered[int(rank) - 1]
+
+
+# Threads for hedged sync calls (the first attempt must be waitable with a timeout)
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    if _hedge_pool is None:
+        _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="outbound-hedge")
+    return _hedge_pool
+
+
+class Provider:
+    """Adaptive limit, retries and optional hedging for one upstream provider."""
+    
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        max_limit: int,
+        latency_target_s: float,
+        hedge: Tuple[str, ...] = (),
+        batch_kinds: Tuple[str, ...] = (),
+        hedge_percentile: float = OUTBOUND_HEDGE_PERCENTILE,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        backoff_base_s: float = OUTBOUND_BACKOFF_BASE_S,
+        backoff_max_s: float = OUTBOUND_BACKOFF_MAX_S
+    ):
+        self.name = name
+        self.limiter = AdaptiveLimiter(initial_limit, max_limit, latency_target_s)
+        # One latency window per call kind, so small and large calls don't mix
+        self.latencies: Dict[str, LatencyTracker] = {}
+        # Call kinds that may be hedged
+        self.hedge = hedge
+        # Call kinds whose latency scales with input size (not an overload signal)
+        self.batch_kinds = batch_kinds
+        self.hedge_percentile = hedge_percentile
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "errors": 0,
+            "overloads": 0,
+            "failures": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "deadline_exceeded": 0
+        }
+    
+    # ── feedback ──────────────────────────────────────────────────────────────
+    
+    def _latencies(self, kind: str) -> LatencyTracker:
+        tracker = self.latencies.get(kind)
+        if tracker is None:
+            tracker = self.latencies.setdefault(kind, LatencyTracker())
+        return tracker
+    
+    def _on_success(self, latency_s: float, kind: str) -> None:
+        self._latencies(kind).add(latency_s)
+        self.limiter.on_success(latency_s, judge_latency=kind not in self.batch_kinds)
+    
+    def _on_error(self, error: Exception) -> None:
+        self._metrics["errors"] += 1
+        if is_retryable(error):
+            self._metrics["overloads"] += 1
+            self.limiter.on_overload()
+    
+    def _hedge_delay(self, idempotent: bool, kind: str) -> Optional[float]:
+        if not (idempotent and kind in self.hedge and OUTBOUND_HEDGING):
+            return None
+        return self._latencies(kind).percentile(self.hedge_percentile)
+    
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+        return max(delay, min(_retry_after(error), self.backoff_max_s))
+    
+    def _check_deadline(self) -> Optional[float]:
+        """Seconds left on the request deadline (None if unbounded); raises once it has passed."""
+        remaining = deadline_remaining()
+        if remaining is not None and remaining <= 0:
+            self._metrics["deadline_exceeded"] += 1
+            raise DeadlineExceeded(f"{self.name}: request deadline passed")
+        return remaining
+    
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Backoff before the next attempt; re-raises if the error is final."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            self._metrics["failures"] += 1
+            raise error
+        delay = self._backoff(attempt, error)
+        remaining = deadline_remaining()
+        if remaining is not None and delay >= remaining:
+            # No time left to wait and try again
+            self._metrics["failures"] += 1
+            raise error
+        self._metrics["retries"] += 1
+        return delay
+    
+    # ── sync calls ────────────────────────────────────────────────────────────
+    
+    def _attempt(self, fn: Callable[[], Any], kind: str, slot_held: bool = False) -> Any:
+        if not slot_held:
+            self.limiter.acquire()
+        self._metrics["attempts"] += 1
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._on_error(e)
+            raise
+        finally:
+            self.limiter.release()
+        self._on_success(time.monotonic() - start, kind)
+        return result
+    
+    def _hedged_attempt(self, fn: Callable[[], Any], kind: str, delay: float) -> Any:
+        pool = _get_hedge_pool()
+        primary = pool.submit(self._attempt, fn, kind)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        # Never hedge past the limit: that would add load to a struggling provider
+        if not self.limiter.try_acquire():
+            return primary.result()
+        
+        self._metrics["hedges"] += 1
+        hedge = pool.submit(self._attempt, fn, kind, True)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._metrics["hedge_wins"] += 1
+                    # The slower attempt finishes in the background and is ignored
+                    return future.result()
+        return primary.result()
+    
+    def call(self, fn: Callable[[], Any], idempotent: bool = False, kind: str = "call") -> Any:
+        """
+        Run a blocking provider call.
+        
+        Args:
+            fn: Zero-argument function making one request
+            idempotent: Safe to send twice (enables hedging)
+            kind: Call kind: picks the latency window and whether it is hedged
+            
+        Returns:
+            The call's result
+        """
+        self._metrics["calls"] += 1
+        attempt = 0
+        while True:
+            # A blocking call can't be interrupted; the deadline gates each attempt
+            self._check_deadline()
+            try:
+                delay = self._hedge_delay(idempotent, kind)
+                if delay is None:
+                    return self._attempt(fn, kind)
+                return self._hedged_attempt(fn, kind, delay)
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+    
+    # ── async calls ───────────────────────────────────────────────────────────
+    
+    async def _aattempt(self, make_call: Callable[[], Awaitable[Any]], kind: str, slot_held: bool = False) -> Any:
+        if not slot_held:
+            await self.limiter.aacquire()
+        self._metrics["attempts"] += 1
+        start = time.monotonic()
+        try:
+            result = await make_call()
+        except Exception as e:
+            self._on_error(e)
+            raise
+        finally:
+            self.limiter.release()
+        self._on_success(time.monotonic() - start, kind)
+        return result
+    
+    async def _ahedged_attempt(self, make_call: Callable[[], Awaitable[Any]], kind: str, delay: float) -> Any:
+        primary = asyncio.ensure_future(self._aattempt(make_call, kind))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self.limiter.try_acquire():
+            return await primary
+        
+        self._metrics["hedges"] += 1
+        hedge = asyncio.ensure_future(self._aattempt(make_call, kind, slot_held=True))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is hedge:
+                            self._metrics["hedge_wins"] += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            # Cancel the loser (or both, if the caller went away)
+            for task in (primary, hedge):
+                task.cancel()
+    
+    async def acall(
+        self,
+        make_call: Callable[[], Awaitable[Any]],
+        idempotent: bool = False,
+        kind: str = "call"
+    ) -> Any:
+        """
+        Run an async provider call.
+        
+        Args:
+            make_call: Zero-argument function returning a fresh awaitable per attempt
+            idempotent: Safe to send twice (enables hedging)
+            kind: Call kind: picks the latency window and whether it is hedged
+            
+        Returns:
+            The call's result
+        """
+        self._metrics["calls"] += 1
+        attempt = 0
+        while True:
+            remaining = self._check_deadline()
+            try:
+                delay = self._hedge_delay(idempotent, kind)
+                if delay is None:
+                    call = self._aattempt(make_call, kind)
+                else:
+                    call = self._ahedged_attempt(make_call, kind, delay)
+                if remaining is None:
+                    return await call
+                # Cancels the attempt (and any hedge) when the deadline passes
+                return await with_budget(call, remaining)
+            except DeadlineExceeded:
+                self._metrics["deadline_exceeded"] += 1
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+    
+    def get_metrics(self) -> Dict:
+        """Get call counts, the current limit and recent latency percentiles per call kind."""
+        latency_ms = {}
+        for kind, tracker in sorted(self.latencies.items()):
+            p50, p95 = tracker.percentile(50), tracker.percentile(95)
+            latency_ms[kind] = {
+                "p50": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95": round(p95 * 1000, 1) if p95 is not None else None
+            }
+        return {
+            **self._metrics,
+            "limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "latency_ms": latency_ms
+        }
+
+
+# Provider instances, created on first use from OUTBOUND_PROVIDERS
+_providers: Dict[str, Provider] = {}
+
+
+def get_provider(name: str) -> Provider:
+    """Get the shared call policy for a provider ("llm", "web_search", "embeddings")."""
+    if name not in _providers:
+        _providers[name] = Provider(name, **OUTBOUND_PROVIDERS[name])
+    return _providers[name]
+
+
+def get_outbound_metrics() -> Dict[str, Dict]:
+    """Get metrics for every provider used so far."""
+    return {name: provider.get_metrics() for name, provider in _providers.items()}
@@ -0,0 +1,388 @@
+"""
+Sampling profiler for the API.
+
+A background thread periodically snapshots every thread's Python stack
+(sys._current_frames) and attributes each sample to the request being
+served: event-loop samples via the running asyncio task, worker-thread
+samples (asyncio.to_thread / run_in_executor) via the submitting request.
+Samples are wall-clock: a worker thread blocked on an HTTP call shows up,
+a coroutine suspended in await does not (it isn't on any stack).
+
+Two modes share the one thread:
+- per request: ?profile=1 samples at PROFILER_REQUEST_HZ until the
+  response is finished; the stacks are kept for download by ID
+- continuous: low-rate sampling of all traffic, broken down by endpoint
+
+Stacks export in the collapsed format ("frame;frame;frame count") read by
+flamegraph.pl, speedscope and inferno.
+"""
+
+import asyncio
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config import (
+    ADMIN_TOKEN,
+    PROFILER_REQUEST_HZ,
+    PROFILER_MAX_STACKS,
+    PROFILER_KEEP_PROFILES
+)
+
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MAX_DEPTH = 128
+_TRUNCATED = "(truncated)"
+
+
+class RequestTag:
+    """Which request a task or worker thread is working for."""
+    
+    __slots__ = ("endpoint", "profile_id")
+    
+    def __init__(self, endpoint: str, profile_id: Optional[str] = None):
+        self.endpoint = endpoint
+        self.profile_id = profile_id
+
+
+# Tag of the request being served in this context
+_current_tag: ContextVar[Optional[RequestTag]] = ContextVar("request_tag", default=None)
+
+# Tags for tasks on the event loop and for busy worker threads
+_task_tags: "weakref.WeakKeyDictionary[asyncio.Task, RequestTag]" = weakref.WeakKeyDictionary()
+_thread_tags: Dict[int, RequestTag] = {}
+
+
+def is_admin(headers: Mapping[str, str]) -> bool:
+    """Whether the request carries ADMIN_TOKEN (never true while none is configured)."""
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TAGGING (task factory + executor)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _tagging_task_factory(loop, coro, **kwargs):
+    """Child tasks inherit the tag of the request that created them."""
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    tag = context.get(_current_tag) if context is not None else _current_tag.get()
+    if tag is not None:
+        _task_tags[task] = tag
+    return task
+
+
+def _run_tagged(tag: Optional[RequestTag], fn, *args, **kwargs):
+    ident = threading.get_ident()
+    if tag is not None:
+        _thread_tags[ident] = tag
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _thread_tags.pop(ident, None)
+
+
+class TaggingExecutor(ThreadPoolExecutor):
+    """Default executor that remembers which request submitted each job."""
+    
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(_run_tagged, _current_tag.get(), fn, *args, **kwargs)
+
+
+def install(loop: asyncio.AbstractEventLoop) -> None:
+    """Hook the event loop so samples can be attributed to requests."""
+    loop.set_task_factory(_tagging_task_factory)
+    loop.set_default_executor(TaggingExecutor(thread_name_prefix="asyncio"))
+    get_sampler().loop = loop
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PROFILES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Profile:
+    """Sample counts per collapsed stack."""
+    
+    def __init__(self, hz: float):
+        self.hz = hz
+        self.started = time.time()
+        self.duration_s = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+    
+    def add(self, stack: str) -> None:
+        self.samples += 1
+        if stack in self.stacks or len(self.stacks) < PROFILER_MAX_STACKS:
+            self.stacks[stack] += 1
+        else:
+            self.stacks[_TRUNCATED] += 1
+    
+    def collapsed(self, prefix: str = "") -> List[str]:
+        """Lines in collapsed-stack format, heaviest first."""
+        return [f"{prefix}{stack} {count}" for stack, count in self.stacks.most_common()]
+    
+    def summary(self) -> Dict:
+        return {
+            "hz": self.hz,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "duration_s": round(self.duration_s or time.time() - self.started, 3)
+        }
+
+
+class StackSampler:
+    """One background thread serving per-request and continuous profiles."""
+    
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        self._active: Dict[str, Profile] = {}
+        self._finished: "OrderedDict[str, Profile]" = OrderedDict()
+        self._continuous_hz = 0.0
+        self._continuous: Dict[str, Profile] = {}
+        self._code_names: Dict[object, str] = {}
+    
+    # ── control ───────────────────────────────────────────────────────────────
+    
+    @property
+    def active(self) -> bool:
+        return bool(self._active) or self._continuous_hz > 0
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+    
+    def start_request(self) -> str:
+        """Start a per-request profile; returns its ID."""
+        profile_id = f"p{next(self._ids)}-{int(time.time())}"
+        with self._lock:
+            self._active[profile_id] = Profile(PROFILER_REQUEST_HZ)
+        self._ensure_thread()
+        return profile_id
+    
+    def finish_request(self, profile_id: str) -> Optional[Profile]:
+        """Stop a per-request profile and keep it for download."""
+        with self._lock:
+            profile = self._active.pop(profile_id, None)
+            if profile is None:
+                return None
+            profile.duration_s = time.time() - profile.started
+            self._finished[profile_id] = profile
+            while len(self._finished) > PROFILER_KEEP_PROFILES:
+                self._finished.popitem(last=False)
+        return profile
+    
+    def get_profile(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._finished.get(profile_id) or self._active.get(profile_id)
+    
+    def start_continuous(self, hz: float, reset: bool = False) -> None:
+        """Sample all traffic at a low rate (keeps running until stopped)."""
+        with self._lock:
+            self._continuous_hz = hz
+            if reset:
+                self._continuous = {}
+        self._ensure_thread()
+    
+    def stop_continuous(self) -> None:
+        with self._lock:
+            self._continuous_hz = 0.0
+    
+    def continuous_collapsed(self, endpoint: Optional[str] = None) -> str:
+        """Collapsed stacks; each stack is rooted at its endpoint unless filtered to one."""
+        with self._lock:
+            if endpoint is not None:
+                profile = self._continuous.get(endpoint)
+                lines = profile.collapsed() if profile else []
+            else:
+                lines = [
+                    line
+                    for name, profile in sorted(self._continuous.items())
+                    for line in profile.collapsed(prefix=f"{name};")
+                ]
+        return "\n".join(lines) + ("\n" if lines else "")
+    
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "continuous_hz": self._continuous_hz,
+                "continuous": {name: p.summary() for name, p in sorted(self._continuous.items())},
+                "active_request_profiles": list(self._active),
+                "finished_request_profiles": {pid: p.summary() for pid, p in self._finished.items()}
+            }
+    
+    # ── sampling ──────────────────────────────────────────────────────────────
+    
+    def _frame_name(self, code) -> str:
+        name = self._code_names.get(code)
+        if name is None:
+            path = code.co_filename
+            if path.startswith(_BACKEND_DIR):
+                path = os.path.relpath(path, _BACKEND_DIR)
+            elif "site-packages" + os.sep in path:
+                path = path.split("site-packages" + os.sep, 1)[1]
+            else:
+                path = os.path.basename(path)
+            name = f"{code.co_name} ({path}:{code.co_firstlineno})"
+            self._code_names[code] = name
+        return name
+    
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < _MAX_DEPTH:
+            names.append(self._frame_name(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+    
+    def _tagged_frames(self) -> List[Tuple[Optional[RequestTag], object]]:
+        """(tag, frame) for the event loop thread and every busy worker thread."""
+        loop = self.loop
+        loop_thread = getattr(loop, "_thread_id", None)
+        result = []
+        for ident, frame in sys._current_frames().items():
+            if ident == loop_thread:
+                task = asyncio.current_task(loop)
+                if task is None:
+                    # Idle in select() or running a plain callback
+                    continue
+                result.append((_task_tags.get(task), frame))
+            elif ident in _thread_tags:
+                result.append((_thread_tags.get(ident), frame))
+        return result
+    
+    def _sample(self, continuous_due: bool) -> None:
+        samples = self._tagged_frames()
+        with self._lock:
+            for tag, frame in samples:
+                request_profile = self._active.get(tag.profile_id) if tag is not None and tag.profile_id else None
+                if not (continuous_due or request_profile):
+                    continue
+                stack = self._collapse(frame)
+                if request_profile is not None:
+                    request_profile.add(stack)
+                if continuous_due:
+                    endpoint = tag.endpoint if tag is not None else "(other)"
+                    profile = self._continuous.get(endpoint)
+                    if profile is None:
+                        profile = self._continuous[endpoint] = Profile(self._continuous_hz)
+                    profile.add(stack)
+    
+    def _run(self) -> None:
+        next_continuous = time.monotonic()
+        while True:
+            with self._lock:
+                requests, hz = bool(self._active), self._continuous_hz
+            if not requests and hz <= 0:
+                # Nothing to do: sleep until a profile is started
+                self._wake.wait()
+                self._wake.clear()
+                next_continuous = time.monotonic()
+                continue
+            
+            now = time.monotonic()
+            continuous_due = hz > 0 and now >= next_continuous
+            if continuous_due:
+                next_continuous = now + 1 / hz
+            try:
+                self._sample(continuous_due)
+            except Exception as e:
+                print(f"Warning: Profiler sample failed: {e}")
+            
+            interval = 1 / PROFILER_REQUEST_HZ if requests else max(0.0, next_continuous - time.monotonic())
+            self._wake.wait(interval)
+            self._wake.clear()
+
+
+# Global sampler instance
+_sampler: Optional[StackSampler] = None
+
+
+def get_sampler() -> StackSampler:
+    """Get the shared sampler (the thread starts on first use)."""
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler()
+    return _sampler
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ASGI MIDDLEWARE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _endpoint_label(scope) -> str:
+    """Route template ("GET /api/documents/{doc_id}/status") for a request."""
+    from starlette.routing import Match
+    
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{scope['method']} {route.path}"
+    return f"{scope['method']} (unmatched)"
+
+
+class ProfilingMiddleware:
+    """
+    Tags requests for the sampler and handles ?profile=1.
+    
+    Costs nothing while no profile is running. A profiled response carries
+    an X-Profile-Id header; the stacks are at /api/admin/profiles/{id}.
+    ?profile=1 is ignored unless the request carries ADMIN_TOKEN.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        sampler = get_sampler()
+        profile_id = None
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("profile", [None])[-1] == "1":
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+            if is_admin(headers):
+                profile_id = sampler.start_request()
+        
+        if profile_id is None and not sampler.active:
+            return await self.app(scope, receive, send)
+        
+        tag = RequestTag(_endpoint_label(scope), profile_id)
+        token = _current_tag.set(tag)
+        # The server created this task before the tag existed
+        task = asyncio.current_task()
+        _task_tags[task] = tag
+        
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start" and profile_id:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+        
+        try:
+            # Runs until the body is fully sent, so streamed responses are covered
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _current_tag.reset(token)
+            _task_tags.pop(task, None)
+            if profile_id:
+                sampler.finish_request(profile_id)
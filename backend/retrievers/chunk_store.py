@@ -0,0 +1,259 @@
+"""
+Compact Columnar Chunk Store.
+Single home for chunk text and metadata, shared by FAISS and BM25 by chunk ID.
+
+Layout (in VECTOR_STORE_DIR):
+- chunks.bin:       UTF-8 chunk texts back to back (read through mmap)
+- chunks.cols:      array-backed columns (doc, page, chunk_index, text offsets)
+- chunks.meta.json: chunk count and the per-document table (doc_id, filename)
+
+Chunk IDs are dense integers in insertion order: chunk N is row N of every
+column, and the FAISS and BM25 indexes store chunk IDs instead of Documents.
+"""
+
+import json
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from config import VECTOR_STORE_DIR
+
+
+BLOB_FILE = "chunks.bin"
+COLUMNS_FILE = "chunks.cols"
+META_FILE = "chunks.meta.json"
+
+# Metadata key stamped on Documents once they have a chunk ID
+CHUNK_ID_KEY = "chunk_id"
+
+
+class ChunkStore:
+    """
+    Append-only chunk store with integer IDs.
+    
+    Metadata lives in typed arrays (4 bytes per value instead of a dict per
+    chunk); text lives in an mmap'd blob and is decoded only on access.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._doc_ids: List[str] = []
+        self._filenames: List[str] = []
+        self._doc_lookup: Dict[str, int] = {}
+        self._doc_col = array("I")
+        self._page_col = array("I")
+        self._chunk_index_col = array("I")
+        self._offsets = array("Q", [0])
+        self._blob: Optional[mmap.mmap] = None
+        self._blob_size = 0
+    
+    # ───────────────────────────────────────────────────────────────────────────
+    # Persistence
+    # ───────────────────────────────────────────────────────────────────────────
+    
+    @property
+    def _blob_path(self) -> Path:
+        return self.directory / BLOB_FILE
+    
+    def exists(self) -> bool:
+        """Whether a persisted store is present on disk."""
+        return (self.directory / META_FILE).exists()
+    
+    def load(self) -> "ChunkStore":
+        """Load columns and map the text blob."""
+        with open(self.directory / META_FILE) as f:
+            meta = json.load(f)
+        count = meta["count"]
+        
+        self._doc_ids = [doc_id for doc_id, _ in meta["docs"]]
+        self._filenames = [filename for _, filename in meta["docs"]]
+        self._doc_lookup = {doc_id: i for i, doc_id in enumerate(self._doc_ids)}
+        
+        with open(self.directory / COLUMNS_FILE, "rb") as f:
+            for column in (self._doc_col, self._page_col, self._chunk_index_col):
+                del column[:]
+                column.fromfile(f, count)
+            self._offsets = array("Q")
+            self._offsets.fromfile(f, count + 1)
+        
+        self._remap()
+        return self
+    
+    def save(self) -> None:
+        """Persist columns and the doc table (the blob is written on add)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        tmp = self.directory / (COLUMNS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            for column in (self._doc_col, self._page_col, self._chunk_index_col, self._offsets):
+                column.tofile(f)
+        os.replace(tmp, self.directory / COLUMNS_FILE)
+        
+        tmp = self.directory / (META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"count": len(self), "docs": list(zip(self._doc_ids, self._filenames))}, f)
+        os.replace(tmp, self.directory / META_FILE)
+    
+    def _remap(self) -> None:
+        """(Re)map the blob after it has grown."""
+        # The old map isn't closed: a concurrent reader may be slicing it, and
+        # it is unmapped once the last reference goes away
+        size = self._blob_path.stat().st_size if self._blob_path.exists() else 0
+        blob = None
+        if size:
+            with open(self._blob_path, "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._blob = blob
+        self._blob_size = size
+    
+    # ───────────────────────────────────────────────────────────────────────────
+    # Writes
+    # ───────────────────────────────────────────────────────────────────────────
+    
+    def _doc_number(self, doc_id: str, filename: str) -> int:
+        number = self._doc_lookup.get(doc_id)
+        if number is None:
+            number = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._filenames.append(filename)
+            self._doc_lookup[doc_id] = number
+        return number
+    
+    def add(self, documents: List[Document]) -> List[int]:
+        """
+        Append chunks and stamp each Document with its chunk ID.
+        
+        Args:
+            documents: Chunk Documents from process_document
+            
+        Returns:
+            Assigned chunk IDs, in order
+        """
+        if not documents:
+            return []
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        first_id = len(self)
+        # Offsets are relative to the committed blob size, not any stale tail
+        position = self._offsets[-1]
+        
+        with open(self._blob_path, "r+b" if self._blob_path.exists() else "wb") as f:
+            f.seek(position)
+            for doc in documents:
+                meta = doc.metadata
+                encoded = doc.page_content.encode("utf-8")
+                f.write(encoded)
+                position += len(encoded)
+                self._offsets.append(position)
+                self._doc_col.append(self._doc_number(meta.get("doc_id", ""), meta.get("filename", "Unknown")))
+                self._page_col.append(int(meta.get("page") or 0))
+                self._chunk_index_col.append(int(meta.get("chunk_index") or 0))
+            f.truncate(position)
+        
+        ids = list(range(first_id, len(self)))
+        for doc, chunk_id in zip(documents, ids):
+            doc.metadata[CHUNK_ID_KEY] = chunk_id
+        
+        self._remap()
+        return ids
+    
+    def ids_for(self, documents: List[Document]) -> List[int]:
+        """Chunk IDs for Documents, adding any that aren't stored yet."""
+        missing = [doc for doc in documents if CHUNK_ID_KEY not in doc.metadata]
+        if missing:
+            self.add(missing)
+        return [doc.metadata[CHUNK_ID_KEY] for doc in documents]
+    
+    # ───────────────────────────────────────────────────────────────────────────
+    # Reads
+    # ───────────────────────────────────────────────────────────────────────────
+    
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+    
+    def get_text(self, chunk_id: int) -> str:
+        """Decode one chunk's text from the blob."""
+        start, end = self._offsets[chunk_id], self._offsets[chunk_id + 1]
+        if start == end:
+            return ""
+        return self._blob[start:end].decode("utf-8")
+    
+    def iter_texts(self, ids: Optional[Iterable[int]] = None) -> Iterable[str]:
+        """Decode texts lazily, for all chunks or the given IDs."""
+        for chunk_id in (range(len(self)) if ids is None else ids):
+            yield self.get_text(chunk_id)
+    
+    def documents(self) -> List[Tuple[str, str]]:
+        """Stored documents as (doc_id, filename), in insertion order."""
+        return list(zip(self._doc_ids, self._filenames))
+    
+    def get_document(self, chunk_id: int) -> Document:
+        """Materialize a LangChain Document for one chunk."""
+        doc_number = self._doc_col[chunk_id]
+        filename = self._filenames[doc_number]
+        return Document(
+            page_content=self.get_text(chunk_id),
+            metadata={
+                "doc_id": self._doc_ids[doc_number],
+                "filename": filename,
+                "page": self._page_col[chunk_id],
+                "chunk_index": self._chunk_index_col[chunk_id],
+                "source": filename,
+                CHUNK_ID_KEY: chunk_id
+            }
+        )
+    
+    def get_documents(self, ids: Iterable[int]) -> List[Document]:
+        """Materialize Documents for the given chunk IDs, in order."""
+        return [self.get_document(chunk_id) for chunk_id in ids]
+
+
+# Retriever class (built on first use to keep langchain_core.retrievers off the import path)
+_retriever_class = None
+
+
+def make_chunk_retriever(search_ids: Callable[[str], List[int]]):
+    """
+    Wrap an ID search function as a LangChain retriever.
+    
+    Args:
+        search_ids: Function mapping a query to ranked chunk IDs
+        
+    Returns:
+        BaseRetriever that materializes Documents only for the results
+    """
+    global _retriever_class
+    if _retriever_class is None:
+        from langchain_core.retrievers import BaseRetriever
+        
+        class ChunkRetriever(BaseRetriever):
+            search_fn: Callable[[str], List[int]]
+            
+            def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+                return get_chunk_store().get_documents(self.search_fn(query))
+        
+        _retriever_class = ChunkRetriever
+    return _retriever_class(search_fn=search_ids)
+
+
+# Global chunk store instance
+_chunk_store: Optional[ChunkStore] = None
+
+
+def get_chunk_store() -> ChunkStore:
+    """Get the chunk store, loading it from disk on first use."""
+    global _chunk_store
+    if _chunk_store is None:
+        store = ChunkStore(VECTOR_STORE_DIR)
+        if store.exists():
+            try:
+                store.load()
+            except Exception as e:
+                print(f"Warning: Could not load chunk store: {e}")
+                store = ChunkStore(VECTOR_STORE_DIR)
+        _chunk_store = store
+    return _chunk_store
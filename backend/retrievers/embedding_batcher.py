@@ -0,0 +1,136 @@
+"""
+Micro-batching for query embeddings.
+Concurrent searches wait a few milliseconds so their queries can be
+embedded in one batch call instead of one round trip each.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+from ingestion.document_processor import get_embeddings
+from outbound.deadline import set_deadline
+
+
+class QueryEmbeddingBatcher:
+    """
+    Collects queries for up to max_wait_s (or until max_batch_size are
+    waiting) and embeds them with one call; every caller gets its own vector.
+    
+    Its timer, futures and tasks belong to the event loop of the first
+    embed() call, so a batcher serves one loop only.
+    """
+    
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_s: float = EMBED_BATCH_MAX_WAIT_MS / 1000
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max_wait_s
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Keep references to in-flight batches so they aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+        self._metrics = {
+            "queries": 0,
+            "batches": 0,
+            "texts_embedded": 0,
+            "max_batch": 0,
+            "embed_seconds": 0.0,
+            "errors": 0
+        }
+    
+    async def embed(self, text: str) -> List[float]:
+        """Embed one query, sharing the backend call with concurrent callers."""
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif loop is not self.loop:
+            raise RuntimeError("QueryEmbeddingBatcher used from a different event loop")
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._metrics["queries"] += 1
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_s, self._flush)
+        
+        return await future
+    
+    def _flush(self) -> None:
+        """Send everything collected so far as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # A batch serves many requests: the first caller's deadline mustn't cut it
+        # short (each caller still stops waiting at its own deadline)
+        set_deadline(None)
+        # Identical queries in one window are embedded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        start = time.perf_counter()
+        try:
+            # Blocking HTTP call / forward pass: keep it off the event loop
+            vectors = await asyncio.to_thread(self.embed_batch, texts)
+        except Exception as e:
+            self._metrics["errors"] += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self._metrics["batches"] += 1
+        self._metrics["texts_embedded"] += len(texts)
+        self._metrics["max_batch"] = max(self._metrics["max_batch"], len(batch))
+        self._metrics["embed_seconds"] += time.perf_counter() - start
+        
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            # Callers that gave up (cancelled) are skipped
+            if not future.done():
+                future.set_result(by_text[text])
+    
+    def get_metrics(self) -> Dict:
+        """Get batch counts and sizes."""
+        batches = self._metrics["batches"]
+        return {
+            **self._metrics,
+            "embed_seconds": round(self._metrics["embed_seconds"], 3),
+            "mean_batch": round(self._metrics["texts_embedded"] / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000
+        }
+
+
+# Global batcher instance
+_batcher: Optional[QueryEmbeddingBatcher] = None
+
+
+def get_query_batcher() -> QueryEmbeddingBatcher:
+    """
+    Get the query embedding batcher of the running event loop.
+    
+    A new loop (server restart in the same process, a benchmark's
+    asyncio.run) gets a fresh batcher instead of timers and futures bound
+    to a loop that no longer runs.
+    """
+    global _batcher
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher.loop not in (None, loop):
+        # Resolve the model per batch so a swapped embeddings client is picked up
+        _batcher = QueryEmbeddingBatcher(lambda texts: get_embeddings().embed_queries(texts))
+    return _batcher
@@ -1,85 +1,279 @@
 """
 Hybrid Retriever with FAISS + BM25 and Reciprocal Rank Fusion.
 Combines semantic search with keyword matching for better recall.
+Both indexes return chunk IDs; Documents are built only for the fused top-k.
+Every search runs against one pinned index snapshot, so an upload landing
+mid-search never mixes two versions of the indexes. Fused results are
+cached per snapshot version (see retrievers.retrieval_cache).
 """
 
-from typing import List, Optional
+import asyncio
+import time
+from typing import Dict, List, Optional, TYPE_CHECKING
 from langchain_core.documents import Document
-from langchain_classic.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 
-from config import FAISS_WEIGHT, BM25_WEIGHT
-from retrievers.vector_store import get_retriever as get_faiss_retriever
+from config import FAISS_WEIGHT, BM25_WEIGHT, RRF_K
+from retrievers.chunk_store import get_chunk_store, make_chunk_retriever
+from retrievers.embedding_batcher import get_query_batcher
+from retrievers.retrieval_cache import get_retrieval_cache
+from ingestion.document_processor import get_embeddings
+from retrievers.index_snapshot import (
+    IndexSnapshot,
+    current_snapshot,
+    pin_snapshot,
+    publish,
+    writer_lock
+)
+from retrievers.vector_store import (
+    initialize_vector_store,
+    search_ids as faiss_search_ids,
+    search_ids_by_vectors as faiss_search_ids_by_vectors
+)
 
+if TYPE_CHECKING:
+    from rank_bm25 import BM25Okapi
 
-# BM25 document corpus
-_bm25_documents: List[Document] = []
-_bm25_retriever: Optional[BM25Retriever] = None
-_ensemble_retriever: Optional[EnsembleRetriever] = None
+
+# Whether persisted indexes have been loaded into this process
+_persisted_loaded = False
+
+
+def _tokenize(text: str) -> List[str]:
+    """Whitespace tokenizer (same as BM25Retriever's default)."""
+    return text.split()
+
+
+def _build_bm25(size: int) -> "BM25Okapi":
+    """Build a BM25 index over chunks 0..size-1 of the chunk store."""
+    from rank_bm25 import BM25Okapi
+    
+    store = get_chunk_store()
+    return BM25Okapi([_tokenize(text) for text in store.iter_texts(range(size))])
 
 
 def update_bm25_corpus(documents: List[Document]) -> None:
     """
     Update the BM25 retriever with new documents.
     
+    The BM25 corpus is always the whole chunk store, so chunks persisted by
+    earlier runs (or the bulk ingester) are included too.
+    
     Args:
         documents: Documents to add to BM25 corpus
     """
-    global _bm25_documents, _bm25_retriever, _ensemble_retriever
+    if not documents:
+        return
     
-    _bm25_documents.extend(documents)
-    
-    if _bm25_documents:
-        _bm25_retriever = BM25Retriever.from_documents(
-            _bm25_documents,
-            k=4
-        )
-        # Reset ensemble to force rebuild
-        _ensemble_retriever = None
+    with writer_lock:
+        get_chunk_store().ids_for(documents)
+        load_bm25_from_store()
+
+
+def load_bm25_from_store() -> None:
+    """Index every chunk in the chunk store (BM25 itself is not persisted)."""
+    with writer_lock:
+        size = len(get_chunk_store())
+        if size == 0 or size == current_snapshot().bm25_size:
+            return
+        # Built beside the published index: searches keep using the old one meanwhile
+        publish(bm25=_build_bm25(size), bm25_size=size)
+
+
+def load_persisted_indexes() -> None:
+    """Load the persisted FAISS index and rebuild BM25 from the chunk store (once per process)."""
+    global _persisted_loaded
+    if _persisted_loaded:
+        return
+    with writer_lock:
+        if _persisted_loaded:
+            return
+        if current_snapshot().vectors is None:
+            initialize_vector_store()
+        load_bm25_from_store()
+        _persisted_loaded = True
 
 
-def get_hybrid_retriever(k: int = 4) -> Optional[EnsembleRetriever]:
+def get_bm25_corpus_size() -> int:
+    """Get number of chunks in the BM25 corpus."""
+    return current_snapshot().bm25_size
+
+
+def bm25_search_ids(query: str, k: int = 4, snapshot: Optional[IndexSnapshot] = None) -> List[int]:
     """
-    Get the hybrid ensemble retriever combining FAISS and BM25.
-    Uses Reciprocal Rank Fusion for result merging.
+    Keyword search returning chunk IDs, best first.
     
     Args:
-        k: Number of documents to retrieve from each retriever
+        query: Search query
+        k: Number of results
+        snapshot: Pinned snapshot to search (default: the current one)
         
     Returns:
-        EnsembleRetriever with FAISS + BM25, or None if no documents
+        Chunk IDs (empty if the corpus is empty)
     """
-    global _ensemble_retriever, _bm25_retriever
-    
-    if _ensemble_retriever is not None:
-        return _ensemble_retriever
+    import numpy as np
     
-    faiss_retriever = get_faiss_retriever(k=k)
+    snapshot = snapshot or current_snapshot()
+    if snapshot.bm25 is None or not snapshot.bm25_size:
+        return []
     
-    # If no FAISS retriever (no documents indexed yet)
-    if faiss_retriever is None:
-        # Use BM25 only if available
-        if _bm25_retriever is not None:
-            _ensemble_retriever = EnsembleRetriever(
-                retrievers=[_bm25_retriever],
-                weights=[1.0]
-            )
-            return _ensemble_retriever
+    scores = snapshot.bm25.get_scores(_tokenize(query))
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    # BM25 rows are chunk IDs
+    return top.tolist()
+
+
+def get_bm25_retriever(k: int = 4):
+    """Get a BM25-only retriever, or None if the corpus is empty."""
+    if current_snapshot().bm25 is None:
         return None
+    return make_chunk_retriever(lambda query: bm25_search_ids(query, k))
+
+
+def reciprocal_rank_fusion(id_lists: List[List[int]], weights: List[float]) -> List[int]:
+    """
+    Weighted Reciprocal Rank Fusion over ranked chunk ID lists.
     
-    # If no BM25 corpus yet, return just FAISS wrapped in ensemble
-    if _bm25_retriever is None:
-        _ensemble_retriever = EnsembleRetriever(
-            retrievers=[faiss_retriever],
-            weights=[1.0]
-        )
+    Args:
+        id_lists: Ranked results from each retriever
+        weights: Weight per retriever
+        
+    Returns:
+        Chunk IDs ordered by fused score (ties keep first-seen order)
+    """
+    scores: Dict[int, float] = {}
+    for ids, weight in zip(id_lists, weights):
+        for rank, chunk_id in enumerate(ids, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rank + RRF_K)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _fuse(query: str, faiss_ids: Optional[List[int]], k: int, snapshot: IndexSnapshot) -> List[int]:
+    """
+    Fuse FAISS results for a query with BM25 results.
+    
+    Args:
+        query: Search query (for BM25)
+        faiss_ids: FAISS results, or None if there is no FAISS index
+        k: Number of results
+        snapshot: Snapshot the FAISS results came from
+        
+    Returns:
+        Fused chunk IDs, best first
+    """
+    has_bm25 = snapshot.bm25 is not None
+    
+    if faiss_ids is not None and has_bm25:
+        id_lists = [faiss_ids, bm25_search_ids(query, k, snapshot)]
+        weights = [FAISS_WEIGHT, BM25_WEIGHT]
+    elif faiss_ids is not None:
+        id_lists, weights = [faiss_ids], [1.0]
+    elif has_bm25:
+        id_lists, weights = [bm25_search_ids(query, k, snapshot)], [1.0]
     else:
-        _ensemble_retriever = EnsembleRetriever(
-            retrievers=[faiss_retriever, _bm25_retriever],
-            weights=[FAISS_WEIGHT, BM25_WEIGHT]
+        return []
+    
+    return reciprocal_rank_fusion(id_lists, weights)[:k]
+
+
+def hybrid_search_ids(query: str, k: int = 4) -> List[int]:
+    """
+    Hybrid search returning the fused top-k chunk IDs.
+    
+    Args:
+        query: Search query
+        k: Number of results (also fetched from each retriever)
+        
+    Returns:
+        Chunk IDs, best first
+    """
+    load_persisted_indexes()
+    cache = get_retrieval_cache()
+    with pin_snapshot() as snapshot:
+        ids = cache.get(query, k, snapshot.version)
+        if ids is not None:
+            return ids
+        start = time.perf_counter()
+        faiss_ids = faiss_search_ids(query, k, snapshot) if snapshot.vectors is not None else None
+        ids = _fuse(query, faiss_ids, k, snapshot)
+        cache.put(query, k, snapshot.version, ids, time.perf_counter() - start)
+        return ids
+
+
+def batch_hybrid_search_ids(queries: List[str], k: int = 4) -> List[List[int]]:
+    """
+    Hybrid search for many queries in one pass.
+    
+    All queries are embedded in a single batched call and searched against
+    FAISS together; BM25 scores each query against the same corpus snapshot.
+    
+    Args:
+        queries: Search queries
+        k: Number of results per query
+        
+    Returns:
+        Fused chunk IDs per query, best first
+    """
+    load_persisted_indexes()
+    cache = get_retrieval_cache()
+    # One pinned version for the lookups, the searches and the stores
+    with pin_snapshot() as snapshot:
+        has_faiss = snapshot.vectors is not None
+        if not queries or not (has_faiss or snapshot.bm25 is not None):
+            return [[] for _ in queries]
+        
+        results: List[Optional[List[int]]] = [cache.get(query, k, snapshot.version) for query in queries]
+        missed = [i for i, ids in enumerate(results) if ids is None]
+        if not missed:
+            return results
+        
+        start = time.perf_counter()
+        vectors = get_embeddings().embed_queries([queries[i] for i in missed]) if has_faiss else None
+        faiss_lists = (
+            faiss_search_ids_by_vectors(vectors, k, snapshot)
+            if vectors is not None else [None] * len(missed)
         )
+        for i, faiss_ids in zip(missed, faiss_lists):
+            results[i] = _fuse(queries[i], faiss_ids, k, snapshot)
+        
+        per_query_s = (time.perf_counter() - start) / len(missed)
+        for i in missed:
+            cache.put(queries[i], k, snapshot.version, results[i], per_query_s)
+    return results
+
+
+def batch_search_documents(queries: List[str], k: int = 4) -> List[List[Document]]:
+    """
+    Search documents for many queries at once.
+    
+    Args:
+        queries: Search queries
+        k: Number of results per query
+        
+    Returns:
+        Relevant documents per query
+    """
+    store = get_chunk_store()
+    return [store.get_documents(ids) for ids in batch_hybrid_search_ids(queries, k)]
+
+
+def get_hybrid_retriever(k: int = 4):
+    """
+    Get the hybrid retriever combining FAISS and BM25.
+    Uses Reciprocal Rank Fusion for result merging.
     
-    return _ensemble_retriever
+    Args:
+        k: Number of documents to retrieve
+        
+    Returns:
+        Retriever over fused chunk IDs, or None if no documents
+    """
+    load_persisted_indexes()
+    snapshot = current_snapshot()
+    if snapshot.vectors is None and snapshot.bm25 is None:
+        return None
+    return make_chunk_retriever(lambda query: hybrid_search_ids(query, k))
 
 
 def search_documents(query: str, k: int = 4) -> List[Document]:
@@ -93,7 +287,45 @@ def search_documents(query: str, k: int = 4) -> List[Document]:
     Returns:
         List of relevant documents with metadata
     """
-    retriever = get_hybrid_retriever(k=k)
-    if retriever is None:
-        return []
-    return retriever.invoke(query)
+    return get_chunk_store().get_documents(hybrid_search_ids(query, k))
+
+
+async def async_search_documents(query: str, k: int = 4) -> List[Document]:
+    """
+    Search documents using hybrid retrieval, without blocking the event loop.
+    
+    The query embedding goes through the shared micro-batcher, so concurrent
+    requests share one embedding call; index searches run in a worker thread.
+    
+    Args:
+        query: Search query
+        k: Number of results
+        
+    Returns:
+        List of relevant documents with metadata
+    """
+    if not _persisted_loaded:
+        await asyncio.to_thread(load_persisted_indexes)
+    
+    cache = get_retrieval_cache()
+    # One pinned version for the lookup, the search and the store
+    with pin_snapshot() as snapshot:
+        ids = cache.get(query, k, snapshot.version)
+        if ids is not None:
+            # Materializing a few Documents from the mmap is cheap enough for the loop
+            return get_chunk_store().get_documents(ids)
+        
+        start = time.perf_counter()
+        vector = None
+        if snapshot.vectors is not None and snapshot.vectors.ntotal > 0:
+            vector = await get_query_batcher().embed(query)
+        
+        def search() -> List[Document]:
+            faiss_ids = None
+            if snapshot.vectors is not None:
+                faiss_ids = faiss_search_ids_by_vectors([vector], k, snapshot)[0] if vector is not None else []
+            ids = _fuse(query, faiss_ids, k, snapshot)
+            cache.put(query, k, snapshot.version, ids, time.perf_counter() - start)
+            return get_chunk_store().get_documents(ids)
+        
+        return await asyncio.to_thread(search)
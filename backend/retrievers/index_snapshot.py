@@ -0,0 +1,126 @@
+"""
+Versioned index snapshots.
+
+Searches pin the current snapshot and use only what it references, so an
+upload can build the next version beside it without locking readers out.
+Writers (one at a time, under writer_lock) publish the new version with a
+single reference swap. A superseded version is reclaimed as soon as the
+last reader pinned to it finishes.
+
+Chunk IDs are append-only, so every ID a snapshot's indexes can return
+stays readable from the chunk store.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class IndexSnapshot:
+    """One immutable version of the search indexes."""
+    
+    __slots__ = ("version", "vectors", "bm25", "bm25_size", "published_at", "pins")
+    
+    def __init__(
+        self,
+        version: int = 0,
+        vectors: Any = None,
+        bm25: Any = None,
+        bm25_size: int = 0
+    ):
+        self.version = version
+        # SegmentedIndex over chunk IDs (None until something is embedded)
+        self.vectors = vectors
+        # BM25Okapi whose rows are chunk IDs 0..bm25_size-1
+        self.bm25 = bm25
+        self.bm25_size = bm25_size
+        self.published_at = time.time()
+        # Readers currently holding this version (guarded by _state_lock)
+        self.pins = 0
+    
+    def replace(self, **changes) -> "IndexSnapshot":
+        """The next version, with some components swapped."""
+        fields = {
+            "vectors": self.vectors,
+            "bm25": self.bm25,
+            "bm25_size": self.bm25_size,
+            **changes
+        }
+        return IndexSnapshot(version=self.version + 1, **fields)
+
+
+# Serializes writers: read the current version, build the next, publish it
+writer_lock = threading.RLock()
+
+# Guards the current version, pin counts and the retired set (held briefly)
+_state_lock = threading.Lock()
+_current = IndexSnapshot()
+# Superseded versions still pinned by a reader
+_retired: Dict[int, IndexSnapshot] = {}
+_metrics = {
+    "published": 0,
+    "reclaimed": 0
+}
+
+
+def current_snapshot() -> IndexSnapshot:
+    """The latest version (unpinned: for quick checks, not for searching)."""
+    return _current
+
+
+@contextmanager
+def pin_snapshot() -> Iterator[IndexSnapshot]:
+    """Hold the current version for the duration of a search."""
+    with _state_lock:
+        snapshot = _current
+        snapshot.pins += 1
+    try:
+        yield snapshot
+    finally:
+        with _state_lock:
+            snapshot.pins -= 1
+            if snapshot.pins == 0 and snapshot.version in _retired:
+                _reclaim(snapshot)
+
+
+def _reclaim(snapshot: IndexSnapshot) -> None:
+    # Dropping the registry's reference frees whatever no newer version shares
+    _retired.pop(snapshot.version, None)
+    _metrics["reclaimed"] += 1
+
+
+def publish(**changes) -> IndexSnapshot:
+    """
+    Publish the next version with some components replaced.
+    
+    Call with writer_lock held, after building the new components from
+    current_snapshot(); readers switch over on their next pin.
+    """
+    global _current
+    with _state_lock:
+        old = _current
+        _current = old.replace(**changes)
+        _metrics["published"] += 1
+        if old.pins:
+            _retired[old.version] = old
+        else:
+            _reclaim(old)
+    return _current
+
+
+def get_snapshot_metrics() -> Dict:
+    """Current version, pinned readers and versions awaiting reclamation."""
+    with _state_lock:
+        snapshot = _current
+        oldest: Optional[IndexSnapshot] = min(_retired.values(), key=lambda s: s.version, default=None)
+        return {
+            **_metrics,
+            "version": snapshot.version,
+            "vectors": snapshot.vectors.ntotal if snapshot.vectors is not None else 0,
+            "vector_segments": len(snapshot.vectors.segments) if snapshot.vectors is not None else 0,
+            "bm25_chunks": snapshot.bm25_size,
+            "pinned_readers": snapshot.pins + sum(s.pins for s in _retired.values()),
+            "retired_versions": len(_retired),
+            "oldest_retired_age_s": round(time.time() - oldest.published_at, 3) if oldest else None
+        }
@@ -0,0 +1,107 @@
+"""
+Retrieval result cache.
+The agent often repeats a document_search query across loop iterations and
+turns (and the citation lookup repeats the tool's own search), so fused
+chunk IDs are cached per (normalized query, k, index snapshot version).
+Any index write publishes a new version, which empties the cache.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import RETRIEVAL_CACHE_SIZE
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapse whitespace only.
+    
+    BM25 tokenizes on whitespace, so this never changes the results; case
+    and punctuation do affect them and are kept.
+    """
+    return " ".join(query.split())
+
+
+class RetrievalCache:
+    """Thread-safe LRU of ranked chunk IDs for the current index version."""
+    
+    def __init__(self, capacity: int = RETRIEVAL_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[str, int], List[int]]" = OrderedDict()
+        self._version = -1
+        self._lock = threading.Lock()
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "miss_seconds": 0.0
+        }
+    
+    def _sync_version(self, version: int) -> bool:
+        """Drop entries from older versions; False if `version` is itself stale."""
+        if version > self._version:
+            if self._entries:
+                self._metrics["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+        return version == self._version
+    
+    def get(self, query: str, k: int, version: int) -> Optional[List[int]]:
+        """Cached chunk IDs, or None on a miss (counted)."""
+        if self.capacity <= 0:
+            return None
+        key = (normalize_query(query), k)
+        with self._lock:
+            ids = self._entries.get(key) if self._sync_version(version) else None
+            if ids is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return list(ids)
+    
+    def put(self, query: str, k: int, version: int, ids: List[int], elapsed_s: float) -> None:
+        """Store a search result computed against `version` in elapsed_s seconds."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._metrics["miss_seconds"] += elapsed_s
+            # A search that pinned a superseded snapshot mustn't repopulate the cache
+            if not self._sync_version(version):
+                return
+            key = (normalize_query(query), k)
+            self._entries[key] = list(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+    
+    def get_metrics(self) -> Dict:
+        """Hit rate and estimated time saved (hits x mean miss latency)."""
+        with self._lock:
+            hits, misses = self._metrics["hits"], self._metrics["misses"]
+            mean_miss_s = self._metrics["miss_seconds"] / misses if misses else 0.0
+            return {
+                **self._metrics,
+                "miss_seconds": round(self._metrics["miss_seconds"], 3),
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                "mean_miss_ms": round(mean_miss_s * 1000, 2),
+                "saved_seconds_est": round(hits * mean_miss_s, 3),
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "index_version": self._version
+            }
+
+
+# Global cache instance
+_cache: Optional[RetrievalCache] = None
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Get the shared retrieval cache (created once)."""
+    global _cache
+    if _cache is None:
+        _cache = RetrievalCache()
+    return _cache
@@ -1,30 +1,231 @@
 """
 FAISS Vector Store Manager.
 Handles vector store creation, updates, and persistence.
+Vectors are keyed by chunk ID; text and metadata live in the chunk store.
+
+The index is a list of immutable FAISS segments held by the current index
+snapshot: adding vectors builds a new segment and publishes a new snapshot,
+so searches in flight never see an index being modified. Segments are
+persisted as they are (one file each, listed in the index metadata), so a
+save only writes the segments that aren't on disk yet.
 """
 
+import json
 import os
-from typing import List, Optional
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
 from pathlib import Path
 
-from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
-from config import VECTOR_STORE_DIR
+from config import VECTOR_STORE_DIR, FAISS_MAX_SEGMENTS, EMBEDDING_MODEL
 from ingestion.document_processor import get_embeddings
+from retrievers.chunk_store import get_chunk_store, make_chunk_retriever
+from retrievers.index_snapshot import (
+    IndexSnapshot,
+    current_snapshot,
+    pin_snapshot,
+    publish,
+    writer_lock
+)
+
+if TYPE_CHECKING:
+    import faiss
+    import numpy as np
+
+
+# Single-file index of stores saved before segments were persisted
+INDEX_FILE = "index.faiss"
+# Embedding model (lets re-indexing reuse vectors) and the segment files, in order
+INDEX_META_FILE = "index.meta.json"
+SEGMENT_FILE = "index.{name}.faiss"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+
+class SegmentedIndex:
+    """
+    FAISS segments (IndexIDMap over chunk IDs) searched as one index.
+    
+    Never modified once built: adding vectors returns a new SegmentedIndex
+    that shares the existing segments and appends one. Each segment has a
+    unique name, which is also its file name once persisted.
+    """
+    
+    def __init__(self, segments: Sequence["faiss.Index"], names: Optional[Sequence[str]] = None):
+        self.segments: Tuple["faiss.Index", ...] = tuple(segments)
+        self.names: Tuple[str, ...] = tuple(names) if names is not None else tuple(
+            _new_segment_name() for _ in self.segments
+        )
+        self.ntotal = sum(segment.ntotal for segment in self.segments)
+        self.d = self.segments[0].d if self.segments else 0
+    
+    def search(self, matrix: "np.ndarray", k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Nearest k per query across all segments (same shape as faiss Index.search)."""
+        import numpy as np
+        
+        results = [
+            segment.search(matrix, min(k, segment.ntotal))
+            for segment in self.segments if segment.ntotal
+        ]
+        if len(results) == 1:
+            return results[0]
+        distances = np.concatenate([d for d, _ in results], axis=1)
+        ids = np.concatenate([i for _, i in results], axis=1)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(ids, order, axis=1)
+    
+    def with_vectors(self, matrix: "np.ndarray", ids: "np.ndarray") -> "SegmentedIndex":
+        """
+        A new index with the vectors added as a fresh segment.
+        
+        Log-structured merging keeps the segment count logarithmic: the new
+        segment absorbs its neighbour while that one is at most twice its size.
+        """
+        import faiss
+        
+        segment = faiss.IndexIDMap(faiss.IndexFlatL2(matrix.shape[1]))
+        segment.add_with_ids(matrix, ids)
+        segments, names = list(self.segments), list(self.names)
+        while segments and (segments[-1].ntotal <= 2 * segment.ntotal or len(segments) >= FAISS_MAX_SEGMENTS):
+            names.pop()
+            segment = _merge_segments([segments.pop(), segment])
+        segments.append(segment)
+        names.append(_new_segment_name())
+        return SegmentedIndex(segments, names)
+
+
+def _new_segment_name() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _merge_segments(segments: Sequence["faiss.Index"]) -> "faiss.Index":
+    """Copy segments (oldest first) into one new IndexIDMap."""
+    import faiss
+    
+    merged = faiss.IndexIDMap(faiss.IndexFlatL2(segments[0].d))
+    for segment in segments:
+        if segment.ntotal:
+            vectors = faiss.downcast_index(segment.index).reconstruct_n(0, segment.ntotal)
+            merged.add_with_ids(vectors, faiss.vector_to_array(segment.id_map))
+    return merged
+
+
+def get_vector_store() -> Optional[SegmentedIndex]:
+    """Get the vector index of the current snapshot."""
+    return current_snapshot().vectors
+
+
+def save_vector_store() -> None:
+    """Persist the chunk store and the FAISS segments not yet on disk."""
+    store_path = Path(VECTOR_STORE_DIR)
+    store_path.mkdir(parents=True, exist_ok=True)
+    with writer_lock:
+        get_chunk_store().save()
+        vectors = current_snapshot().vectors
+        if vectors is not None:
+            write_index(store_path, vectors)
+
+
+def write_index(store_path: Path, vectors: SegmentedIndex) -> None:
+    """
+    Write an index's segments and metadata.
+    
+    Segments never change, so existing segment files are kept as they are;
+    files of segments the index no longer has (merged away) are removed once
+    the new metadata is in place.
+    """
+    import faiss
+    
+    for name, segment in zip(vectors.names, vectors.segments):
+        path = store_path / SEGMENT_FILE.format(name=name)
+        if not path.exists():
+            tmp = path.with_name(path.name + ".tmp")
+            faiss.write_index(segment, str(tmp))
+            os.replace(tmp, path)
+    write_index_meta(store_path, vectors.d, vectors.names)
+    
+    keep = {SEGMENT_FILE.format(name=name) for name in vectors.names}
+    for path in store_path.glob(SEGMENT_FILE.format(name="*")):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    (store_path / INDEX_FILE).unlink(missing_ok=True)
+
+
+def read_index(store_path: Path) -> Optional[SegmentedIndex]:
+    """Load a persisted index (segment files, or a single-file index.faiss), or None."""
+    import faiss
+    
+    meta = read_index_meta(store_path)
+    if meta and meta.get("segments"):
+        names = meta["segments"]
+        return SegmentedIndex(
+            [faiss.read_index(str(store_path / SEGMENT_FILE.format(name=name))) for name in names],
+            names
+        )
+    if (store_path / INDEX_FILE).exists():
+        return SegmentedIndex([faiss.read_index(str(store_path / INDEX_FILE))])
+    return None
+
+
+def has_persisted_index(store_path: Path) -> bool:
+    """Whether a FAISS index has been saved in store_path."""
+    meta = read_index_meta(store_path)
+    return bool(meta and meta.get("segments")) or (store_path / INDEX_FILE).exists()
+
+
+def write_index_meta(store_path: Path, dimension: int, segments: Sequence[str] = ()) -> None:
+    """Record the embedding model and the segment files next to the FAISS index."""
+    tmp = store_path / (INDEX_META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"embedding_model": EMBEDDING_MODEL, "dimension": dimension, "segments": list(segments)}, f)
+    os.replace(tmp, store_path / INDEX_META_FILE)
 
 
-# Global vector store instance
-_vector_store: Optional[FAISS] = None
+def read_index_meta(store_path: Path) -> Optional[Dict]:
+    """Index metadata, or None for stores saved before it was recorded."""
+    try:
+        with open(store_path / INDEX_META_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
 
-def get_vector_store() -> Optional[FAISS]:
-    """Get the current vector store instance."""
-    global _vector_store
-    return _vector_store
+def _migrate_legacy_store(store_path: Path) -> "faiss.Index":
+    """
+    Convert a LangChain FAISS store (index.faiss + pickled docstore).
+    
+    Documents move into the chunk store in index order and the vectors are
+    re-keyed by chunk ID; the pickled docstore is removed afterwards.
+    """
+    import faiss
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+    
+    legacy = FAISS.load_local(
+        str(store_path),
+        get_embeddings(),
+        allow_dangerous_deserialization=True
+    )
+    documents = [
+        legacy.docstore.search(legacy.index_to_docstore_id[i])
+        for i in range(legacy.index.ntotal)
+    ]
+    ids = get_chunk_store().add(documents)
+    
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(legacy.index.d))
+    if ids:
+        vectors = legacy.index.reconstruct_n(0, legacy.index.ntotal)
+        index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    
+    publish(vectors=SegmentedIndex([index]))
+    # Writes the segment files and removes the LangChain index.faiss
+    save_vector_store()
+    (store_path / LEGACY_DOCSTORE_FILE).unlink(missing_ok=True)
+    print(f"✅ Migrated {len(ids)} chunks to the chunk store")
+    return index
 
 
-def initialize_vector_store(documents: Optional[List[Document]] = None) -> Optional[FAISS]:
+def initialize_vector_store(documents: Optional[List[Document]] = None) -> Optional[SegmentedIndex]:
     """
     Initialize or load vector store.
     
@@ -32,62 +233,115 @@ def initialize_vector_store(documents: Optional[List[Document]] = None) -> Optio
         documents: Optional initial documents to index
         
     Returns:
-        FAISS vector store instance or None if no documents
+        Vector index or None if no documents
     """
-    global _vector_store
-    
-    embeddings = get_embeddings()
     store_path = Path(VECTOR_STORE_DIR)
     
-    # Try to load existing store
-    if store_path.exists() and (store_path / "index.faiss").exists():
-        try:
-            _vector_store = FAISS.load_local(
-                str(store_path),
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-            
-            # Add new documents if provided
-            if documents:
-                _vector_store.add_documents(documents)
-                _vector_store.save_local(str(store_path))
-        except Exception as e:
-            print(f"Warning: Could not load existing vector store: {e}")
-            if documents:
-                _vector_store = FAISS.from_documents(documents, embeddings)
-                store_path.mkdir(parents=True, exist_ok=True)
-                _vector_store.save_local(str(store_path))
-    
-    elif documents:
-        # Create new store with documents
-        _vector_store = FAISS.from_documents(documents, embeddings)
-        store_path.mkdir(parents=True, exist_ok=True)
-        _vector_store.save_local(str(store_path))
-    
-    # Don't create placeholder - let it be None until documents are uploaded
-    
-    return _vector_store
-
-
-def add_documents(documents: List[Document]) -> None:
+    with writer_lock:
+        # Try to load existing store
+        if has_persisted_index(store_path):
+            try:
+                if (store_path / LEGACY_DOCSTORE_FILE).exists():
+                    _migrate_legacy_store(store_path)
+                else:
+                    publish(vectors=read_index(store_path))
+            except Exception as e:
+                print(f"Warning: Could not load existing vector store: {e}")
+        
+        # Add new documents if provided (creates the index on first use)
+        if documents:
+            add_documents(documents)
+        
+        # Don't create placeholder - let it be None until documents are uploaded
+        
+        return current_snapshot().vectors
+
+
+def add_documents(
+    documents: List[Document],
+    vectors: Optional[List[List[float]]] = None,
+    persist: bool = True
+) -> None:
     """
     Add documents to the vector store.
     
     Args:
         documents: Documents to add
+        vectors: Precomputed embeddings (computed here if omitted)
+        persist: Save to disk now; bulk loaders pass False and call
+            save_vector_store() once at the end
     """
-    global _vector_store
+    import numpy as np
+    
+    if not documents:
+        return
     
-    if _vector_store is None:
-        initialize_vector_store(documents)
-    else:
-        _vector_store.add_documents(documents)
+    if vectors is None:
+        # Embedding is the slow part: don't hold up other writers for it
+        vectors = get_embeddings().embed_documents([doc.page_content for doc in documents])
+    matrix = np.asarray(vectors, dtype="float32")
+    
+    with writer_lock:
+        if get_vector_store() is None and has_persisted_index(Path(VECTOR_STORE_DIR)):
+            initialize_vector_store()
+        
+        ids = get_chunk_store().ids_for(documents)
+        current = get_vector_store() or SegmentedIndex([])
+        publish(vectors=current.with_vectors(matrix, np.asarray(ids, dtype="int64")))
         
         # Persist
-        store_path = Path(VECTOR_STORE_DIR)
-        store_path.mkdir(parents=True, exist_ok=True)
-        _vector_store.save_local(str(store_path))
+        if persist:
+            save_vector_store()
+
+
+def search_ids_by_vectors(
+    vectors: List[List[float]],
+    k: int = 4,
+    snapshot: Optional[IndexSnapshot] = None
+) -> List[List[int]]:
+    """
+    Semantic search for many query vectors in one FAISS call.
+    
+    Args:
+        vectors: Query embeddings
+        k: Number of results per query
+        snapshot: Pinned snapshot to search (default: pin the current one)
+        
+    Returns:
+        Chunk IDs per query, nearest first
+    """
+    import numpy as np
+    
+    if snapshot is None:
+        with pin_snapshot() as snapshot:
+            return search_ids_by_vectors(vectors, k, snapshot)
+    
+    index = snapshot.vectors
+    if index is None or index.ntotal == 0:
+        return [[] for _ in vectors]
+    
+    matrix = np.asarray(vectors, dtype="float32")
+    _, ids = index.search(matrix, min(k, index.ntotal))
+    return [[int(i) for i in row if i != -1] for row in ids]
+
+
+def search_ids(query: str, k: int = 4, snapshot: Optional[IndexSnapshot] = None) -> List[int]:
+    """
+    Semantic search returning chunk IDs, nearest first.
+    
+    Args:
+        query: Search query
+        k: Number of results
+        snapshot: Pinned snapshot to search (default: pin the current one)
+        
+    Returns:
+        Chunk IDs (empty if nothing is indexed)
+    """
+    index = (snapshot or current_snapshot()).vectors
+    if index is None or index.ntotal == 0:
+        return []
+    
+    return search_ids_by_vectors([get_embeddings().embed_query(query)], k, snapshot)[0]
 
 
 def get_retriever(k: int = 4):
@@ -98,14 +352,9 @@ def get_retriever(k: int = 4):
         k: Number of documents to retrieve
         
     Returns:
-        VectorStoreRetriever or None if no documents indexed
+        Retriever over chunk IDs or None if no documents indexed
     """
-    global _vector_store
-    
-    if _vector_store is None:
+    if get_vector_store() is None:
         return None
     
-    return _vector_store.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": k}
-    )
+    return make_chunk_retriever(lambda query: search_ids(query, k))
@@ -2,7 +2,7 @@
 Pydantic models for API request/response schemas.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 import uuid
 
@@ -14,6 +14,17 @@ class ChatRequest(BaseModel):
         default_factory=lambda: str(uuid.uuid4()),
         description="Session ID for conversation memory"
     )
+    timeout_s: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Time budget in seconds (defaults to the server's CHAT_DEADLINE_S, capped at CHAT_MAX_DEADLINE_S)"
+    )
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    queries: List[str] = Field(..., min_length=1, description="Questions to answer over the uploaded documents")
+    k: int = Field(4, ge=1, le=20, description="Chunks retrieved per question")
 
 
 class Citation(BaseModel):
@@ -38,6 +49,23 @@ class ChatResponse(BaseModel):
         description="List of citations with source metadata"
     )
     session_id: str = Field(..., description="Session ID for follow-up queries")
+    stop_reason: Optional[str] = Field(
+        None,
+        description="Why the agent stopped: 'answered', 'max_iterations' or 'deadline' (best-effort answer)"
+    )
+    usage: Optional[Dict[str, int]] = Field(
+        None,
+        description="LLM usage of this request: llm_calls, input_tokens, cached_tokens (served from the provider's prompt cache), output_tokens"
+    )
+
+
+class BatchChatResult(BaseModel):
+    """One streamed result of a batch chat request (NDJSON line)."""
+    index: int = Field(..., description="Position of the question in the request")
+    query: str
+    answer: Optional[str] = Field(None, description="AI-generated answer")
+    citations: List[Citation] = Field(default_factory=list)
+    error: Optional[str] = Field(None, description="Error message if this question failed")
 
 
 class DocumentStatus(BaseModel):
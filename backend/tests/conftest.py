@@ -0,0 +1,36 @@
+"""Shared test setup: run from backend/ imports and no real provider keys."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """
+    Empty vector store in a temporary directory, with fake embeddings.
+    
+    Resets the process-wide chunk store, index snapshot, retrieval cache,
+    query batcher and loaded-index flag so each test starts from nothing.
+    """
+    from benchmarks.fakes import HashingEmbeddings
+    from ingestion import document_processor
+    from retrievers import chunk_store, embedding_batcher, hybrid_retriever, index_snapshot, retrieval_cache, vector_store
+    
+    directory = tmp_path / "vector_store"
+    for module in (chunk_store, vector_store):
+        monkeypatch.setattr(module, "VECTOR_STORE_DIR", str(directory))
+    monkeypatch.setattr(chunk_store, "_chunk_store", None)
+    monkeypatch.setattr(index_snapshot, "_current", index_snapshot.IndexSnapshot())
+    monkeypatch.setattr(index_snapshot, "_retired", {})
+    monkeypatch.setattr(retrieval_cache, "_cache", None)
+    monkeypatch.setattr(embedding_batcher, "_batcher", None)
+    monkeypatch.setattr(hybrid_retriever, "_persisted_loaded", False)
+    monkeypatch.setattr(document_processor, "_embeddings_model", HashingEmbeddings(dim=32))
+    return directory
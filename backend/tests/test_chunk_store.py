@@ -0,0 +1,91 @@
+"""Columnar chunk store: persistence and lookups by chunk ID."""
+
+from array import array
+
+from langchain_core.documents import Document
+
+from retrievers.chunk_store import CHUNK_ID_KEY, ChunkStore
+
+
+def _doc(text, doc_id="d1", filename="a.pdf", page=1, chunk_index=0):
+    return Document(
+        page_content=text,
+        metadata={"doc_id": doc_id, "filename": filename, "page": page, "chunk_index": chunk_index}
+    )
+
+
+DOCS = [
+    _doc("first chunk", page=1, chunk_index=0),
+    _doc("zweiter Abschnitt, größer", page=2, chunk_index=1),
+    _doc("", page=2, chunk_index=2),
+    _doc("other document 📄", doc_id="d2", filename="b.pdf", page=7, chunk_index=0),
+]
+
+
+def _expected(chunk_id):
+    doc = DOCS[chunk_id]
+    return doc.page_content, {**doc.metadata, "source": doc.metadata["filename"], CHUNK_ID_KEY: chunk_id}
+
+
+def test_add_stamps_dense_chunk_ids(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    documents = [Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in DOCS]
+    
+    assert store.add(documents[:2]) == [0, 1]
+    assert store.add(documents[2:]) == [2, 3]
+    assert [doc.metadata[CHUNK_ID_KEY] for doc in documents] == [0, 1, 2, 3]
+    # Already stored: no new rows
+    assert store.ids_for(documents) == [0, 1, 2, 3]
+    assert len(store) == 4
+
+
+def test_save_load_round_trip(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.add([Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in DOCS])
+    store.save()
+    
+    loaded = ChunkStore(str(tmp_path)).load()
+    
+    assert len(loaded) == len(DOCS)
+    for column in ("_doc_col", "_page_col", "_chunk_index_col", "_offsets"):
+        assert isinstance(getattr(loaded, column), array)
+        assert getattr(loaded, column) == getattr(store, column)
+    assert loaded._blob_size == (tmp_path / "chunks.bin").stat().st_size
+    assert list(loaded.iter_texts()) == [d.page_content for d in DOCS]
+    assert loaded.documents() == [("d1", "a.pdf"), ("d2", "b.pdf")]
+    for chunk_id in range(len(DOCS)):
+        doc = loaded.get_document(chunk_id)
+        assert (doc.page_content, doc.metadata) == _expected(chunk_id)
+
+
+def test_unsaved_tail_is_ignored_on_load(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.add([_doc("kept")])
+    store.save()
+    # Written to the blob but never committed to the columns
+    store.add([_doc("lost")])
+    
+    loaded = ChunkStore(str(tmp_path)).load()
+    assert len(loaded) == 1
+    loaded.add([_doc("appended")])
+    assert list(loaded.iter_texts()) == ["kept", "appended"]
+
+
+def test_get_documents_returns_fused_top_k(store_dir):
+    from retrievers.chunk_store import get_chunk_store
+    from retrievers.hybrid_retriever import hybrid_search_ids, update_bm25_corpus
+    from retrievers.vector_store import add_documents
+    
+    documents = [Document(page_content=d.page_content or "placeholder", metadata=dict(d.metadata)) for d in DOCS]
+    add_documents(documents)
+    update_bm25_corpus(documents)
+    
+    ids = hybrid_search_ids("other document", k=2)
+    results = get_chunk_store().get_documents(ids)
+    
+    assert ids[0] == 3
+    assert [doc.metadata[CHUNK_ID_KEY] for doc in results] == ids
+    for chunk_id, doc in zip(ids, results):
+        assert doc.page_content == documents[chunk_id].page_content
+        assert doc.metadata["doc_id"] == DOCS[chunk_id].metadata["doc_id"]
+        assert doc.metadata["page"] == DOCS[chunk_id].metadata["page"]
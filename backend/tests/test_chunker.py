@@ -0,0 +1,52 @@
+"""Offset chunker: spans, size and overlap bounds."""
+
+import pytest
+
+from benchmarks.synthetic import make_pages
+from ingestion.chunker import chunk_pages, iter_chunk_offsets
+
+PAGES = make_pages(seed=7, num_pages=6, chars_per_page=4000)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(1000, 200), (300, 50), (200, 0)])
+def test_offsets_round_trip_to_page_text(chunk_size, chunk_overlap):
+    pages = [(text, number) for number, text in enumerate(PAGES, start=1)]
+    views = list(chunk_pages(pages, chunk_size, chunk_overlap))
+    
+    assert views
+    for view in views:
+        page_text = PAGES[view.page - 1]
+        assert view.page_text is page_text
+        assert view.text == page_text[view.start:view.end]
+        assert view.text == view.text.strip()
+        assert len(view) == len(view.text)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(1000, 200), (300, 50), (200, 0)])
+def test_chunk_size_and_overlap_bounds(chunk_size, chunk_overlap):
+    for text in PAGES:
+        spans = list(iter_chunk_offsets(text, chunk_size, chunk_overlap))
+        
+        assert all(0 < end - start <= chunk_size for start, end in spans)
+        for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+            # Moves forward, overlapping by at most chunk_overlap
+            assert next_start > start and next_end > end
+            assert end - next_start <= chunk_overlap
+        # Nothing but whitespace is left out
+        covered = set()
+        for start, end in spans:
+            covered.update(range(start, end))
+        assert all(text[i].isspace() for i in range(len(text)) if i not in covered)
+
+
+def test_hard_cut_without_separators():
+    text = "x" * 250
+    
+    assert list(iter_chunk_offsets(text, 100, 0)) == [(0, 100), (100, 200), (200, 250)]
+
+
+def test_chunk_contained_in_previous_one_is_dropped():
+    # Hard cut at 4, overlap backs up to 2: the last span would be "ij",
+    # which lies inside "ghij" once the trailing space is stripped
+    assert list(iter_chunk_offsets("ghij ", 4, 2)) == [(0, 4)]
+    assert list(iter_chunk_offsets("ab ghij ", 5, 3)) == [(0, 2), (3, 7)]
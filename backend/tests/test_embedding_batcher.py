@@ -0,0 +1,95 @@
+"""Query embedding micro-batcher: coalescing, result mapping, failures."""
+
+import asyncio
+
+import pytest
+
+from retrievers import embedding_batcher
+from retrievers.embedding_batcher import QueryEmbeddingBatcher, get_query_batcher
+
+
+class RecordingEmbedder:
+    """Embeds text as [len(text), index in batch]; records each batch."""
+    
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+    
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+
+def test_concurrent_queries_share_one_call():
+    embedder = RecordingEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, max_batch_size=16, max_wait_s=0.02)
+    queries = ["a", "bb", "ccc", "bb", "dddd"]
+    
+    async def main():
+        return await asyncio.gather(*(batcher.embed(query) for query in queries))
+    
+    vectors = asyncio.run(main())
+    
+    # Duplicates are embedded once
+    assert embedder.batches == [["a", "bb", "ccc", "dddd"]]
+    # Each caller gets the vector of its own query
+    assert [vector[0] for vector in vectors] == [len(query) for query in queries]
+    assert vectors[1] == vectors[3] == [2.0, 1.0]
+    metrics = batcher.get_metrics()
+    assert (metrics["queries"], metrics["batches"], metrics["max_batch"]) == (5, 1, 5)
+
+
+def test_full_batch_flushes_without_waiting():
+    embedder = RecordingEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, max_batch_size=2, max_wait_s=10)
+    
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.embed(f"q{i}") for i in range(4))),
+            timeout=1
+        )
+    
+    vectors = asyncio.run(main())
+    
+    assert embedder.batches == [["q0", "q1"], ["q2", "q3"]]
+    assert [vector[1] for vector in vectors] == [0.0, 1.0, 0.0, 1.0]
+
+
+def test_provider_failure_fails_every_waiter_in_the_batch():
+    error = RuntimeError("embeddings down")
+    batcher = QueryEmbeddingBatcher(RecordingEmbedder(error), max_batch_size=16, max_wait_s=0.01)
+    
+    async def main():
+        return await asyncio.gather(*(batcher.embed(f"q{i}") for i in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(main())
+    
+    assert results == [error, error, error]
+    assert batcher.get_metrics()["errors"] == 1
+
+
+def test_batcher_rejects_a_second_loop():
+    batcher = QueryEmbeddingBatcher(RecordingEmbedder(), max_wait_s=0)
+    asyncio.run(batcher.embed("q"))
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.embed("q"))
+
+
+def test_each_event_loop_gets_its_own_batcher(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "_batcher", None)
+    
+    async def embed_with_shared_batcher():
+        batcher = get_query_batcher()
+        batcher.embed_batch = RecordingEmbedder()
+        assert get_query_batcher() is batcher
+        await batcher.embed("q")
+        return batcher
+    
+    first = asyncio.run(embed_with_shared_batcher())
+    second = asyncio.run(embed_with_shared_batcher())
+    
+    assert second is not first
+    assert second.get_metrics()["queries"] == 1
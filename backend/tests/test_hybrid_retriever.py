@@ -0,0 +1,50 @@
+"""Hybrid retrieval: result caching across index versions."""
+
+import asyncio
+
+from langchain_core.documents import Document
+
+from retrievers.hybrid_retriever import async_search_documents, hybrid_search_ids, update_bm25_corpus
+from retrievers.index_snapshot import current_snapshot
+from retrievers.retrieval_cache import get_retrieval_cache
+from retrievers.vector_store import add_documents
+
+
+def _add(texts):
+    documents = [Document(page_content=text, metadata={"doc_id": "d", "filename": "f.pdf", "page": 1}) for text in texts]
+    add_documents(documents)
+    update_bm25_corpus(documents)
+
+
+def test_publish_invalidates_cached_results(store_dir):
+    _add([f"filler chunk number {i}" for i in range(8)])
+    cache = get_retrieval_cache()
+    
+    first = hybrid_search_ids("zebra stripes", k=2)
+    assert hybrid_search_ids("zebra stripes", k=2) == first
+    assert cache.get_metrics()["hits"] == 1
+    
+    _add(["zebra stripes and zebra manes"])
+    assert hybrid_search_ids("zebra stripes", k=2)[0] == 8
+    metrics = cache.get_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["invalidations"] == 1
+
+
+def test_async_search_caches_under_the_searched_version(store_dir):
+    _add([f"filler chunk number {i}" for i in range(8)])
+    cache = get_retrieval_cache()
+    
+    async def search():
+        return [doc.page_content for doc in await async_search_documents("zebra stripes", k=2)]
+    
+    first = asyncio.run(search())
+    assert cache.get_metrics()["index_version"] == current_snapshot().version
+    assert asyncio.run(search()) == first
+    assert cache.get_metrics()["hits"] == 1
+    
+    _add(["zebra stripes and zebra manes"])
+    assert asyncio.run(search())[0] == "zebra stripes and zebra manes"
+    metrics = cache.get_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["invalidations"] == 1
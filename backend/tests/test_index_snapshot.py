@@ -0,0 +1,69 @@
+"""Index snapshots: pinning, publishing and reclaiming superseded versions."""
+
+import pytest
+
+from retrievers import index_snapshot
+from retrievers.index_snapshot import current_snapshot, get_snapshot_metrics, pin_snapshot, publish, writer_lock
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot(monkeypatch):
+    monkeypatch.setattr(index_snapshot, "_current", index_snapshot.IndexSnapshot())
+    monkeypatch.setattr(index_snapshot, "_retired", {})
+    monkeypatch.setattr(index_snapshot, "_metrics", {"published": 0, "reclaimed": 0})
+
+
+def test_publish_bumps_version_and_keeps_unchanged_components():
+    with writer_lock:
+        first = publish(vectors="v1", bm25="b1", bm25_size=1)
+        second = publish(bm25="b2", bm25_size=2)
+    
+    assert (first.version, second.version) == (1, 2)
+    assert current_snapshot() is second
+    assert second.vectors == "v1"
+    assert (second.bm25, second.bm25_size) == ("b2", 2)
+
+
+def test_pinned_snapshot_is_unaffected_by_publish():
+    with writer_lock:
+        publish(vectors="v1")
+    
+    with pin_snapshot() as pinned:
+        with writer_lock:
+            publish(vectors="v2")
+        assert pinned.version == 1
+        assert pinned.vectors == "v1"
+        assert current_snapshot().vectors == "v2"
+    
+    with pin_snapshot() as pinned:
+        assert pinned.vectors == "v2"
+
+
+def test_unpinned_snapshot_is_reclaimed_on_publish():
+    with writer_lock:
+        publish(bm25="b1")
+        publish(bm25="b2")
+    
+    metrics = get_snapshot_metrics()
+    assert metrics["reclaimed"] == 2
+    assert metrics["retired_versions"] == 0
+
+
+def test_retired_snapshot_is_reclaimed_when_last_pin_ends():
+    with writer_lock:
+        publish(bm25="b1")
+    
+    with pin_snapshot() as outer:
+        with pin_snapshot():
+            with writer_lock:
+                publish(bm25="b2")
+            assert index_snapshot._retired == {1: outer}
+            assert get_snapshot_metrics()["pinned_readers"] == 2
+        # One reader still holds version 1
+        assert 1 in index_snapshot._retired
+    
+    metrics = get_snapshot_metrics()
+    assert index_snapshot._retired == {}
+    assert metrics["retired_versions"] == 0
+    assert metrics["pinned_readers"] == 0
+    assert metrics["reclaimed"] == 2
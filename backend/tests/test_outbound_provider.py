@@ -0,0 +1,197 @@
+"""Outbound call layer: AIMD limit, retries, hedging and deadlines."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeProviderError, HashingEmbeddings
+from ingestion.document_processor import GuardedEmbeddings
+from outbound import provider as provider_module
+from outbound.deadline import Deadline, DeadlineExceeded, reset_deadline, set_deadline
+from outbound.provider import AdaptiveLimiter, Provider, get_provider
+
+
+@pytest.fixture(autouse=True)
+def hedging_on(monkeypatch):
+    monkeypatch.setattr(provider_module, "OUTBOUND_HEDGING", True)
+
+
+@pytest.fixture
+def deadline():
+    tokens = []
+    
+    def set_(timeout_s):
+        tokens.append(set_deadline(Deadline(timeout_s)))
+    
+    yield set_
+    for token in reversed(tokens):
+        reset_deadline(token)
+
+
+def flaky(failures, status=503, result="ok"):
+    """Function failing `failures` times with a provider error, then returning result."""
+    calls = []
+    
+    def fn():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise FakeProviderError(status)
+        return result
+    
+    return fn, calls
+
+
+def test_overload_halves_limit_and_success_grows_it_back():
+    limiter = AdaptiveLimiter(initial_limit=8, max_limit=32, latency_target_s=1.0)
+    limiter.on_overload()
+    assert limiter.limit == 4
+    
+    for _ in range(100):
+        limiter.on_success(0.01)
+    assert limiter.limit >= 8
+
+
+def test_rate_limit_halves_provider_limit():
+    provider = Provider("test", initial_limit=8, max_limit=32, latency_target_s=1.0, backoff_base_s=0.0)
+    fn, calls = flaky(1, status=429)
+    
+    assert provider.call(fn) == "ok"
+    assert len(calls) == 2
+    # Halved by the 429, then +1/limit for the successful retry
+    assert 4 < provider.limiter.limit < 5
+    assert provider.get_metrics()["overloads"] == 1
+
+
+def test_retryable_error_is_retried_with_jittered_backoff(monkeypatch):
+    bounds, sleeps = [], []
+    
+    def uniform(lo, hi):
+        bounds.append((lo, hi))
+        return hi / 2
+    
+    monkeypatch.setattr(provider_module.random, "uniform", uniform)
+    monkeypatch.setattr(provider_module.time, "sleep", sleeps.append)
+    provider = Provider("test", 8, 32, 1.0, backoff_base_s=0.1, backoff_max_s=5.0)
+    fn, calls = flaky(2, status=503)
+    
+    assert provider.call(fn) == "ok"
+    assert len(calls) == 3
+    # Full jitter: uniform(0, base * 2^attempt)
+    assert bounds == [(0, 0.1), (0, 0.2)]
+    assert sleeps == [0.05, 0.1]
+    assert provider.get_metrics()["retries"] == 2
+
+
+def test_non_retryable_error_is_not_retried():
+    provider = Provider("test", 8, 32, 1.0, backoff_base_s=0.0)
+    fn, calls = flaky(1, status=400)
+    
+    with pytest.raises(FakeProviderError):
+        provider.call(fn)
+    assert len(calls) == 1
+
+
+def _slow_then_fast(slow_s):
+    """First call is slow, later ones return at once."""
+    lock = threading.Lock()
+    calls = []
+    
+    def fn():
+        with lock:
+            calls.append(None)
+            first = len(calls) == 1
+        if first:
+            time.sleep(slow_s)
+            return "primary"
+        return "hedge"
+    
+    return fn, calls
+
+
+def test_hedge_fires_past_p95():
+    provider = Provider("test", 8, 32, 1.0, hedge=("query",))
+    for _ in range(20):
+        provider._latencies("query").add(0.01)
+    fn, calls = _slow_then_fast(0.3)
+    
+    assert provider.call(fn, idempotent=True, kind="query") == "hedge"
+    metrics = provider.get_metrics()
+    assert metrics["hedges"] == 1
+    assert metrics["hedge_wins"] == 1
+
+
+def test_no_hedge_for_batch_kinds_or_non_idempotent_calls():
+    provider = Provider("test", 8, 32, latency_target_s=0.05, hedge=("query",), batch_kinds=("documents",))
+    for kind in ("query", "documents"):
+        for _ in range(20):
+            provider._latencies(kind).add(0.01)
+    
+    fn, _ = _slow_then_fast(0.1)
+    assert provider.call(fn, idempotent=True, kind="documents") == "primary"
+    fn, _ = _slow_then_fast(0.1)
+    assert provider.call(fn, idempotent=False, kind="query") == "primary"
+    assert provider.get_metrics()["hedges"] == 0
+
+
+def test_slow_batch_call_does_not_shrink_limit():
+    provider = Provider("test", 8, 32, latency_target_s=0.01, batch_kinds=("documents",))
+    
+    provider.call(lambda: time.sleep(0.03), kind="documents")
+    assert provider.limiter.limit > 8
+    provider.call(lambda: time.sleep(0.03), kind="query")
+    assert provider.limiter.limit < 8
+
+
+def test_large_query_batches_are_not_hedged():
+    embeddings = GuardedEmbeddings(HashingEmbeddings(dim=16))
+    provider = get_provider("embeddings")
+    
+    embeddings.embed_queries(["a query"] * 4)
+    embeddings.embed_queries(["a query"] * 100)
+    assert {"query", "query_batch"} <= set(provider.latencies)
+    assert "query_batch" not in provider.hedge
+    assert "query_batch" in provider.batch_kinds
+
+
+def test_expired_deadline_stops_before_any_attempt(deadline):
+    provider = Provider("test", 8, 32, 1.0)
+    fn, calls = flaky(0)
+    deadline(0)
+    
+    with pytest.raises(DeadlineExceeded):
+        provider.call(fn)
+    assert calls == []
+
+
+def test_deadline_stops_retries(monkeypatch, deadline):
+    monkeypatch.setattr(provider_module.random, "uniform", lambda lo, hi: hi)
+    provider = Provider("test", 8, 32, 1.0, backoff_base_s=1.0)
+    fn, calls = flaky(5, status=503)
+    deadline(0.5)
+    
+    start = time.monotonic()
+    with pytest.raises(FakeProviderError):
+        provider.call(fn)
+    # The 1s backoff doesn't fit in the budget: no wait, no second attempt
+    assert len(calls) == 1
+    assert time.monotonic() - start < 0.5
+
+
+def test_deadline_cancels_async_attempt():
+    provider = Provider("test", 8, 32, 1.0)
+    
+    async def slow():
+        await asyncio.sleep(1)
+    
+    async def main():
+        # asyncio.run copies the context, so this deadline ends with the run
+        set_deadline(Deadline(0.05))
+        await provider.acall(slow)
+    
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert time.monotonic() - start < 0.5
+    assert provider.limiter.in_flight == 0
@@ -0,0 +1,54 @@
+"""Profiler access: ADMIN_TOKEN is required, and profiling is off without one."""
+
+import asyncio
+
+import pytest
+
+from profiling import sampler as sampler_module
+from profiling.sampler import ProfilingMiddleware, is_admin
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _request(headers=(), client=("127.0.0.1", 5000)):
+    """Run a ?profile=1 request through the middleware; returns the response headers."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/health",
+        "query_string": b"profile=1",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": client
+    }
+    sent = []
+    
+    async def receive():
+        return {"type": "http.request"}
+    
+    async def send(message):
+        sent.append(message)
+    
+    asyncio.run(ProfilingMiddleware(_app)(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "::1", "localhost", "10.0.0.5"])
+def test_no_token_configured_means_no_admin(monkeypatch, host):
+    monkeypatch.setattr(sampler_module, "ADMIN_TOKEN", None)
+    
+    assert not is_admin({})
+    assert not is_admin({"x-admin-token": ""})
+    assert b"x-profile-id" not in _request(client=(host, 5000))
+
+
+def test_token_is_required(monkeypatch):
+    monkeypatch.setattr(sampler_module, "ADMIN_TOKEN", "secret")
+    
+    assert is_admin({"x-admin-token": "secret"})
+    assert not is_admin({"x-admin-token": "wrong"})
+    assert not is_admin({})
+    assert b"x-profile-id" not in _request()
+    assert b"x-profile-id" in _request([("x-admin-token", "secret")], client=("10.0.0.5", 5000))
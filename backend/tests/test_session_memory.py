@@ -0,0 +1,74 @@
+"""Session memory: background summary folds."""
+
+import asyncio
+
+from agents import rag_agent
+from benchmarks.fakes import ScriptedChatModel
+from memory import session_memory
+from outbound.deadline import Deadline, reset_deadline, set_deadline
+
+
+def test_summary_fold_ignores_request_deadline(monkeypatch):
+    monkeypatch.setattr(session_memory, "MEMORY_MODE", "summary")
+    monkeypatch.setattr(session_memory, "SUMMARY_RECENT_TURNS", 1)
+    monkeypatch.setattr(session_memory, "SUMMARY_FOLD_TURNS", 1)
+    llm = ScriptedChatModel(latency_s=0.05, jitter=0.0)
+    monkeypatch.setattr(rag_agent, "get_llm", lambda: llm)
+    
+    async def chat_request():
+        # The turn is recorded with the request's budget almost spent
+        token = set_deadline(Deadline(0.01))
+        try:
+            session_memory.record_turn("deadline-test", "first question", "first answer")
+            session_memory.record_turn("deadline-test", "second question", "second answer")
+            return session_memory.get_or_create_summary_memory("deadline-test").task
+        finally:
+            reset_deadline(token)
+    
+    async def main():
+        failures = session_memory._metrics["summary_failures"]
+        task = await chat_request()
+        await task
+        return failures
+    
+    failures_before = asyncio.run(main())
+    memory = session_memory.get_or_create_summary_memory("deadline-test")
+    try:
+        assert session_memory._metrics["summary_failures"] == failures_before
+        assert memory.summary.startswith("Summary of")
+        assert memory.pending == []
+    finally:
+        session_memory.clear_session("deadline-test")
+
+
+def test_capped_pending_turns_are_counted_and_folded(monkeypatch):
+    monkeypatch.setattr(session_memory, "MEMORY_MODE", "summary")
+    monkeypatch.setattr(session_memory, "SUMMARY_RECENT_TURNS", 1)
+    # Too many to fold yet: the cap alone decides what is replayed
+    monkeypatch.setattr(session_memory, "SUMMARY_FOLD_TURNS", 10)
+    monkeypatch.setattr(session_memory, "MEMORY_MAX_HISTORY_TOKENS", 30)
+    llm = ScriptedChatModel(latency_s=0.0, jitter=0.0)
+    monkeypatch.setattr(rag_agent, "get_llm", lambda: llm)
+    
+    async def main():
+        for i in range(4):
+            session_memory.record_turn("cap-test", f"question {i} " + "x" * 40, f"answer {i} " + "y" * 40)
+        memory = session_memory.get_or_create_summary_memory("cap-test")
+        assert memory.task is None
+        
+        dropped = session_memory._metrics["pending_turns_dropped"]
+        messages = session_memory.get_history_messages("cap-test")
+        # Only the newest turn fits; the three pending ones are left out
+        assert [m["content"][:10] for m in messages] == ["question 3", "answer 3 y"]
+        assert session_memory._metrics["pending_turns_dropped"] - dropped == 3
+        
+        # ...and are folded right away instead of waiting for SUMMARY_FOLD_TURNS
+        await memory.task
+        return memory
+    
+    try:
+        memory = asyncio.run(main())
+        assert memory.pending == []
+        assert memory.summary.startswith("Summary of")
+    finally:
+        session_memory.clear_session("cap-test")
@@ -0,0 +1,114 @@
+"""Vector store persistence: segment files and the legacy LangChain store."""
+
+import json
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retrievers import vector_store
+from retrievers.chunk_store import get_chunk_store
+from retrievers.index_snapshot import current_snapshot, publish, writer_lock
+from retrievers.vector_store import (
+    INDEX_FILE,
+    INDEX_META_FILE,
+    LEGACY_DOCSTORE_FILE,
+    add_documents,
+    initialize_vector_store,
+    search_ids
+)
+
+
+def _documents(start, count):
+    return [
+        Document(page_content=f"chunk {i} about topic{i}", metadata={"doc_id": "d", "filename": "f.pdf", "page": 1})
+        for i in range(start, start + count)
+    ]
+
+
+def _segment_files(store_dir):
+    return {path.name: path.stat().st_mtime_ns for path in store_dir.glob("index.*.faiss")}
+
+
+def test_save_writes_only_new_segments(store_dir):
+    add_documents(_documents(0, 64))
+    first = _segment_files(store_dir)
+    assert len(first) == 1
+    
+    # Too small to merge into the existing segment: persisted as a second file
+    add_documents(_documents(64, 4))
+    second = _segment_files(store_dir)
+    assert len(second) == 2
+    for name, mtime in first.items():
+        assert second[name] == mtime
+    
+    meta = json.loads((store_dir / INDEX_META_FILE).read_text())
+    assert [f"index.{name}.faiss" for name in meta["segments"]] == [
+        f"index.{name}.faiss" for name in current_snapshot().vectors.names
+    ]
+
+
+def test_merged_segments_replace_their_files(store_dir):
+    add_documents(_documents(0, 4))
+    add_documents(_documents(4, 4))
+    
+    vectors = current_snapshot().vectors
+    assert len(vectors.segments) == 1
+    assert set(_segment_files(store_dir)) == {f"index.{vectors.names[0]}.faiss"}
+
+
+def test_segments_reload_in_order(store_dir, monkeypatch):
+    from retrievers import chunk_store, index_snapshot
+    
+    add_documents(_documents(0, 64))
+    add_documents(_documents(64, 4))
+    before = current_snapshot().vectors
+    
+    monkeypatch.setattr(chunk_store, "_chunk_store", None)
+    monkeypatch.setattr(index_snapshot, "_current", index_snapshot.IndexSnapshot())
+    loaded = initialize_vector_store()
+    
+    assert loaded.names == before.names
+    assert loaded.ntotal == 68
+    assert search_ids("chunk 66 about topic66", k=1) == [66]
+
+
+def test_single_file_index_still_loads(store_dir, monkeypatch):
+    import faiss
+    
+    from retrievers import chunk_store, index_snapshot
+    
+    add_documents(_documents(0, 8))
+    vectors = current_snapshot().vectors
+    # A store saved before segments were persisted: index.faiss, no segment list
+    faiss.write_index(vectors.segments[0], str(store_dir / INDEX_FILE))
+    for path in store_dir.glob("index.*.faiss"):
+        path.unlink()
+    vector_store.write_index_meta(store_dir, vectors.d)
+    
+    monkeypatch.setattr(chunk_store, "_chunk_store", None)
+    monkeypatch.setattr(index_snapshot, "_current", index_snapshot.IndexSnapshot())
+    assert initialize_vector_store().ntotal == 8
+    
+    # The next save moves it to segment files
+    add_documents(_documents(8, 8))
+    assert not (store_dir / INDEX_FILE).exists()
+    assert _segment_files(store_dir)
+
+
+def test_legacy_store_is_migrated(store_dir):
+    from langchain_community.vectorstores import FAISS
+    
+    from ingestion.document_processor import get_embeddings
+    
+    documents = _documents(0, 5)
+    FAISS.from_documents(documents, get_embeddings()).save_local(str(store_dir))
+    assert (store_dir / LEGACY_DOCSTORE_FILE).exists()
+    
+    vectors = initialize_vector_store()
+    
+    assert vectors.ntotal == 5
+    assert not (store_dir / LEGACY_DOCSTORE_FILE).exists()
+    assert not (store_dir / INDEX_FILE).exists()
+    store = get_chunk_store()
+    assert [store.get_text(i) for i in range(len(store))] == [doc.page_content for doc in documents]
+    assert search_ids("chunk 3 about topic3", k=1) == [3]
@@ -3,36 +3,47 @@ Vector Store Retriever Tool.
 Wraps the hybrid retriever for agent use.
 """
 
-from typing import List, Dict
-from langchain_core.tools import Tool
+from typing import List, Dict, TYPE_CHECKING
 from langchain_core.documents import Document
 
-from retrievers.hybrid_retriever import search_documents
+from retrievers.hybrid_retriever import search_documents, async_search_documents
 
+if TYPE_CHECKING:
+    from langchain_core.tools import Tool
 
-def get_retriever_tool() -> Tool:
+
+def format_search_results(docs: List[Document]) -> str:
+    """Render retrieved chunks as numbered excerpts for the LLM."""
+    if not docs:
+        return "No relevant documents found in the knowledge base."
+    
+    results = []
+    for i, doc in enumerate(docs):
+        source = doc.metadata.get("filename", "Unknown")
+        page = doc.metadata.get("page", "?")
+        # Return FULL content, not truncated
+        content = doc.page_content
+        results.append(f"[{i+1}] From {source} (Page {page}):\n{content}")
+    
+    return "\n\n".join(results)
+
+
+def get_retriever_tool() -> "Tool":
     """
     Get configured retriever tool for the agent.
     
     Returns:
         LangChain Tool wrapping the hybrid retriever
     """
+    from langchain_core.tools import Tool
+    
     def search_wrapper(query: str) -> str:
         """Search uploaded documents and return results."""
-        docs = search_documents(query, k=4)
-        
-        if not docs:
-            return "No relevant documents found in the knowledge base."
-        
-        results = []
-        for i, doc in enumerate(docs):
-            source = doc.metadata.get("filename", "Unknown")
-            page = doc.metadata.get("page", "?")
-            # Return FULL content, not truncated
-            content = doc.page_content
-            results.append(f"[{i+1}] From {source} (Page {page}):\n{content}")
-        
-        return "\n\n".join(results)
+        return format_search_results(search_documents(query, k=4))
+    
+    async def async_search_wrapper(query: str) -> str:
+        """Same search; the query embedding is micro-batched with concurrent requests."""
+        return format_search_results(await async_search_documents(query, k=4))
     
     return Tool(
         name="document_search",
@@ -44,7 +55,8 @@ Use when the query asks about:
 - Information that should be in the knowledge base
 
 Input should be the search query as a string.""",
-        func=search_wrapper
+        func=search_wrapper,
+        coroutine=async_search_wrapper
     )
 
 
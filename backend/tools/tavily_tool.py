@@ -3,20 +3,25 @@ Tavily Web Search Tool.
 Wraps TavilySearchResults for real-time market news and data.
 """
 
-from typing import List, Dict, Any
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.tools import Tool
+from typing import List, Dict, Any, TYPE_CHECKING
 
 from config import TAVILY_API_KEY
+from outbound.provider import get_provider
 
+if TYPE_CHECKING:
+    from langchain_core.tools import Tool
 
-def get_tavily_tool() -> Tool:
+
+def get_tavily_tool() -> "Tool":
     """
     Get configured Tavily search tool for the agent.
     
     Returns:
         LangChain Tool wrapping TavilySearchResults
     """
+    from langchain_core.tools import Tool
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    
     tavily_search = TavilySearchResults(
         api_key=TAVILY_API_KEY,
         max_results=5,
@@ -25,6 +30,28 @@ def get_tavily_tool() -> Tool:
         include_raw_content=False
     )
     
+    def search(query: str) -> List[Dict[str, Any]]:
+        """
+        Same request as tavily_search.invoke, but errors are raised (the tool
+        itself swallows them) so the outbound layer can retry and adapt.
+        """
+        api = tavily_search.api_wrapper
+        raw_results = get_provider("web_search").call(
+            lambda: api.raw_results(
+                query,
+                tavily_search.max_results,
+                tavily_search.search_depth,
+                tavily_search.include_domains,
+                tavily_search.exclude_domains,
+                tavily_search.include_answer,
+                tavily_search.include_raw_content,
+                tavily_search.include_images
+            ),
+            idempotent=True,
+            kind="search"
+        )
+        return api.clean_results(raw_results["results"])
+    
     return Tool(
         name="web_search",
         description="""Use this tool to search for CURRENT, LIVE, or REAL-TIME information.
@@ -35,7 +62,7 @@ Use when the query asks about:
 - Any information that needs to be up-to-date
 
 Input should be the search query as a string.""",
-        func=tavily_search.invoke
+        func=search
     )
 
 